@@ -0,0 +1,167 @@
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+ONE_YEAR = 365 * 24 * 60 * 60
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class FileRange:
+    """
+    length bytes of an open file from start. read() stops at the end of
+    the range; fileno() and tell() pass through, so a WSGI server's
+    file_wrapper (gunicorn's sendfile) copies the range kernel-side,
+    bounded by Content-Length.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single "bytes=" range, None to serve the
+    whole file (no header, an invalid range or several ranges), or False
+    when the range starts at or past the end of the file.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        # suffix range: the last n bytes; "-0" selects nothing and is ignored
+        if not last or not int(last):
+            return None
+        start = max(size - int(last), 0)
+        end = size - 1
+    else:
+        start = int(first)
+        if last and int(last) < start:
+            # "bytes=5-2" is invalid, not unsatisfiable: ignore it
+            return None
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        return False
+    return start, end
+
+
+def file_etag(st):
+    # inode, size and mtime in ns: changes on every rewrite, so safe as a strong validator
+    return f'"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def is_immutable(path):
+    pattern = getattr(settings, "MEDIA_IMMUTABLE_PATTERN", "")
+    return bool(pattern) and re.search(pattern, os.path.basename(path)) is not None
+
+
+def if_range_matches(request, etag, last_modified):
+    value = request.headers.get("If-Range")
+    if not value:
+        return True
+    if value.startswith(('"', "W/")):
+        return value == etag
+    return parse_http_date_safe(value) == last_modified
+
+
+def offload(path, fullpath):
+    """Empty response telling the front server to send the file itself, or None."""
+    mode = getattr(settings, "MEDIA_SENDFILE", "")
+    if mode == "x-sendfile":
+        header, value = "X-Sendfile", fullpath
+    elif mode == "x-accel-redirect":
+        header, value = "X-Accel-Redirect", settings.MEDIA_ACCEL_PREFIX.rstrip("/") + "/" + quote(path)
+    else:
+        return None
+    content_type, _ = mimetypes.guess_type(fullpath)
+    response = HttpResponse(content_type=content_type or "application/octet-stream")
+    response[header] = value
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve a file under MEDIA_ROOT. Conditional requests are answered here;
+    the body goes to the front server when MEDIA_SENDFILE is set
+    (it then handles Range itself), else to FileResponse with single-range
+    support.
+    """
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+        st = os.stat(fullpath)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        raise Http404("File not found.")
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404("File not found.")
+
+    etag = file_etag(st)
+    last_modified = int(st.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = offload(path, fullpath)
+    if response is None:
+        response = file_response(request, fullpath, st.st_size, etag, last_modified)
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    if response.status_code == 416:
+        # only the file may be cached publicly, not a refusal of one request's range
+        return response
+    if is_immutable(path):
+        patch_cache_control(response, public=True, max_age=ONE_YEAR, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=settings.MEDIA_CACHE_MAX_AGE)
+    return response
+
+
+def file_response(request, fullpath, size, etag, last_modified):
+    byte_range = None
+    if if_range_matches(request, etag, last_modified):
+        byte_range = parse_range(request.headers.get("Range"), size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    file = open(fullpath, "rb")
+    if byte_range is None:
+        response = FileResponse(file)
+    else:
+        start, end = byte_range
+        response = FileResponse(FileRange(file, start, end - start + 1), status=206)
+        response["Content-Length"] = end - start + 1
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    return response
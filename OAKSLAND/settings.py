@@ -62,6 +62,17 @@ AUTH_USER_MODEL = "accounts.CustomUser"
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Media is served by OAKSLAND.media.serve_media. Set MEDIA_SENDFILE to
+# "x-accel-redirect" (nginx, internal location at MEDIA_ACCEL_PREFIX
+# aliased to MEDIA_ROOT) or "x-sendfile" (Apache/lighttpd) to let the
+# front server send the bytes.
+MEDIA_SENDFILE = config("MEDIA_SENDFILE", default="")
+MEDIA_ACCEL_PREFIX = config("MEDIA_ACCEL_PREFIX", default="/protected-media/")
+MEDIA_CACHE_MAX_AGE = config("MEDIA_CACHE_MAX_AGE", cast=int, default=3600)
+# Filenames carrying a content hash (name.<hash>.ext), such as the image
+# variants products.imaging writes, never change, so are cached for a
+# year. Uploaded originals keep Django's names and MEDIA_CACHE_MAX_AGE.
+MEDIA_IMMUTABLE_PATTERN = r"\.[0-9a-f]{8,}\.[^.]+$"
 
 from decouple import config, Csv
 import os
@@ -126,6 +137,48 @@ SIMPLE_JWT = {
     "SIGNING_KEY": SECRET_KEY,
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
+# Local memory is per process; point CACHE_BACKEND/CACHE_LOCATION at a
+# shared cache (e.g. django.core.cache.backends.redis.RedisCache) in production
+# so catalog cache invalidation reaches every worker.
+CACHES = {
+    "default": {
+        "BACKEND": config("CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": config("CACHE_LOCATION", default="oaksland"),
+    }
+}
+CATALOG_CACHE_TIMEOUT = config("CATALOG_CACHE_TIMEOUT", cast=int, default=300)
+# Coalesce concurrent catalog cache misses: "process" (threads of one
+# process), "cache" (a lock in the shared cache, across processes) or ""
+# to disable. Waiters give up and render themselves after the timeout.
+CATALOG_SINGLE_FLIGHT = config("CATALOG_SINGLE_FLIGHT", default="process")
+CATALOG_SINGLE_FLIGHT_TIMEOUT = config("CATALOG_SINGLE_FLIGHT_TIMEOUT", cast=int, default=10)
+# serve the previous entry while another request rebuilds it
+CATALOG_STALE_WHILE_REVALIDATE = config("CATALOG_STALE_WHILE_REVALIDATE", cast=bool, default=True)
+# Answer price-range/in-stock/category filters and price/created_at
+# ordering on product lists from an in-memory NumPy snapshot per process
+# (needs numpy). It refreshes from updated_at when the catalog changes.
+PRODUCT_SNAPSHOT = config("PRODUCT_SNAPSHOT", cast=bool, default=False)
+PRODUCT_SNAPSHOT_MIN_REFRESH = config("PRODUCT_SNAPSHOT_MIN_REFRESH", cast=float, default=1.0)
+# /products/autocomplete/ keeps a prefix index per process. Changed
+# products go to a small overlay; the index is rebuilt (and re-ranked by
+# popularity) when the overlay passes OVERLAY_RATIO of it or after
+# REBUILD_INTERVAL seconds.
+PRODUCT_AUTOCOMPLETE_MIN_REFRESH = config("PRODUCT_AUTOCOMPLETE_MIN_REFRESH", cast=float, default=1.0)
+PRODUCT_AUTOCOMPLETE_REBUILD_INTERVAL = config("PRODUCT_AUTOCOMPLETE_REBUILD_INTERVAL", cast=int, default=3600)
+PRODUCT_AUTOCOMPLETE_OVERLAY_RATIO = 0.05
+# (model, product field) pairs counted as a product's popularity
+PRODUCT_POPULARITY_SOURCES = [("cart.CartItem", "product"), ("cart.OrderLine", "product")]
+# Serve product lists from the products.ProductListing read model; run
+# rebuild_product_listings once before turning this on. While it is off,
+# listings are not maintained at all. While on, bulk writes queue rows as
+# stale: schedule refresh_product_listings to re-render them.
+PRODUCT_LISTING_READ_MODEL = config("PRODUCT_LISTING_READ_MODEL", cast=bool, default=False)
+# Uploaded product images get resized variants (products.imaging) in a
+# background process pool of PRODUCT_IMAGE_WORKERS processes (0: one per
+# CPU). PRODUCT_IMAGE_VARIANTS_SYNC renders them during the save instead.
+PRODUCT_IMAGE_WORKERS = config("PRODUCT_IMAGE_WORKERS", cast=int, default=0)
+PRODUCT_IMAGE_VARIANTS_SYNC = config("PRODUCT_IMAGE_VARIANTS_SYNC", cast=bool, default=False)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -161,7 +214,12 @@ REST_FRAMEWORK = {
         "rest_framework.filters.SearchFilter",
         "rest_framework.filters.OrderingFilter",
     ),
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "OAKSLAND.pagination.KeysetPagination",
+    # encodes with orjson when it is installed, else exactly DRF's JSONRenderer
+    "DEFAULT_RENDERER_CLASSES": (
+        "OAKSLAND.renderers.JSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
     "PAGE_SIZE": 20,
 }
 
@@ -0,0 +1,25 @@
+from django.test import SimpleTestCase
+from rest_framework import renderers
+
+from .renderers import JSONRenderer, StreamingJSONResponse, orjson
+
+SAMPLE = {"name": "Chair\u2028", "price": 1.5, "tags": ["oak", None], "nested": {"ok": True}}
+
+
+class JSONRendererTests(SimpleTestCase):
+    def test_same_bytes_as_drf(self):
+        self.assertEqual(JSONRenderer().render(SAMPLE), renderers.JSONRenderer().render(SAMPLE))
+
+    def test_non_finite_floats(self):
+        if orjson is None:
+            self.skipTest("orjson is not installed")
+        # documented difference: DRF refuses these, orjson writes null
+        with self.assertRaises(ValueError):
+            renderers.JSONRenderer().render({"x": float("nan")})
+        for value in (float("nan"), float("inf"), float("-inf")):
+            self.assertEqual(JSONRenderer().render({"x": value}), b'{"x":null}')
+
+    def test_streamed_body_matches_rendered_body(self):
+        items = [{"id": i, "name": f"Chair {i}"} for i in range(3)]
+        response = StreamingJSONResponse({"count": 3, "results": iter(items)}, "results")
+        self.assertEqual(b"".join(response), JSONRenderer().render({"count": 3, "results": items}))
@@ -1,9 +1,11 @@
+import re
 from django.contrib import admin
 from django.urls import path, include
 from django.http import HttpResponse
 from django.urls import path
 from django.conf import settings
-from django.conf.urls.static import static
+from django.urls import re_path
+from .media import serve_media
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -20,5 +22,5 @@ urlpatterns = [
     path("", include("home.urls")),
     path("api/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
-    
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    re_path(r"^%s(?P<path>.*)$" % re.escape(settings.MEDIA_URL.lstrip("/")), serve_media, name="media"),
+]
@@ -1,27 +1,22 @@
 from django.contrib import admin
-from .models import Order, CartItem
+from .models import Order, OrderLine, CartItem
 
 
-class OrderItemInline(admin.TabularInline):
+class OrderLineInline(admin.TabularInline):
     """
-    Inline CartItems inside Order admin (via ManyToMany 'through' table).
+    OrderLines inside Order admin: the product name, price and quantity
+    recorded at checkout, read-only.
     """
-    model = Order.items.through
+    model = OrderLine
     extra = 0
-    verbose_name = "Cart Item"
-    verbose_name_plural = "Cart Items"
-    fields = ("cartitem", "product", "quantity", "line_total")
-    readonly_fields = ("product", "quantity", "line_total")
+    can_delete = False
+    verbose_name = "Order Line"
+    verbose_name_plural = "Order Lines"
+    fields = ("product", "product_name", "unit_price", "quantity", "line_total")
+    readonly_fields = fields
 
-    def product(self, instance):
-        return instance.cartitem.product.name
-
-    def quantity(self, instance):
-        return instance.cartitem.quantity
-
-    def line_total(self, instance):
-        return instance.cartitem.total_price()
-    line_total.short_description = "Line Total"
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Order)
@@ -30,7 +25,7 @@ class OrderAdmin(admin.ModelAdmin):
     list_filter = ("status", "created_at")
     search_fields = ("user__username", "id")
     readonly_fields = ("total_amount", "created_at")
-    inlines = [OrderItemInline]
+    inlines = [OrderLineInline]
     ordering = ("-created_at",)
 
 
@@ -0,0 +1,83 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from products.listing import mark_stale
+from products.models import Product
+from products.signals import catalog_changed
+
+from .models import CartItem, Order, OrderLine
+
+
+class CheckoutError(Exception):
+    pass
+
+
+def decrement_stock(quantities):
+    """
+    UPDATE product SET stock = stock - qty WHERE id IN (...) AND stock >= qty
+    for {product id: qty} as one statement. The check and the decrement
+    happen on the locked row, so concurrent checkouts cannot both take the
+    last unit. Returns the number of products decremented.
+    """
+    quantity = Case(
+        *[When(pk=pk, then=Value(qty)) for pk, qty in quantities.items()],
+        output_field=IntegerField(),
+    )
+    return Product.objects.filter(pk__in=quantities, stock__gte=quantity).update(
+        stock=F("stock") - quantity, updated_at=timezone.now()
+    )
+
+
+def place_order(user):
+    """
+    Turn user's cart into an Order in one transaction with a fixed number
+    of queries: the cart rows are locked and read once, every product's
+    stock is checked and decremented by decrement_stock, and the order's
+    lines (name and price as they are now) are inserted in bulk. Raises
+    CheckoutError, with nothing written, when the cart is empty or a
+    product is short.
+    """
+    with transaction.atomic():
+        # product order keeps row locks in one order across checkouts
+        items = list(
+            CartItem.objects.filter(user=user).select_related("product").order_by("product_id").select_for_update()
+        )
+        if not items:
+            raise CheckoutError("Cart is empty")
+
+        quantities = {}
+        for item in items:
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+        with transaction.atomic():
+            decremented = decrement_stock(quantities)
+            if decremented != len(quantities):
+                # undo the products that did have enough
+                transaction.set_rollback(True)
+        if decremented != len(quantities):
+            stock = dict(Product.objects.filter(pk__in=quantities).values_list("pk", "stock"))
+            names = {item.product_id: item.product.name for item in items}
+            raise CheckoutError(
+                "Not enough stock for " + ", ".join(names[pk] for pk in quantities if stock.get(pk, 0) < quantities[pk])
+            )
+
+        lines = [
+            OrderLine(
+                product_id=item.product_id,
+                product_name=item.product.name,
+                unit_price=item.product.price,
+                quantity=item.quantity,
+                line_total=item.total_price(),
+            )
+            for item in items
+        ]
+        order = Order.objects.create(user=user, total_amount=sum(line.line_total for line in lines))
+        for line in lines:
+            line.order = order
+        OrderLine.objects.bulk_create(lines)
+        CartItem.objects.filter(pk__in=[item.pk for item in items]).delete()
+
+        # the UPDATE bypasses Product.save(), so retire what its signals would have
+        mark_stale(quantities)
+        transaction.on_commit(catalog_changed)
+    return order
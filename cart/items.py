@@ -0,0 +1,170 @@
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, OuterRef, Subquery
+
+from products.models import Product
+
+from .models import CartItem
+
+
+SYNC_OPS = ("set", "increment", "remove")
+MAX_SYNC_OPERATIONS = 500
+# ids and quantities past this overflow an integer column
+MAX_INT = 2**31 - 1
+
+
+class CartError(Exception):
+    def __init__(self, message, status=400, errors=None):
+        super().__init__(message)
+        self.status = status
+        self.errors = errors
+
+
+def positive_int(value, name, minimum=1):
+    """value as an int in [minimum, MAX_INT] (JSON number or decimal string), else CartError."""
+    if isinstance(value, str) and value.isdecimal():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or not minimum <= value <= MAX_INT:
+        raise CartError(f"{name} must be a {'positive' if minimum else 'non-negative'} integer up to {MAX_INT}")
+    return value
+
+
+def _upsert_sql():
+    """
+    One statement that inserts the item, or adds to its quantity, only
+    while the result fits the product's stock. Affects no row when the
+    product is missing or short, and returns the product's name from the
+    row it wrote.
+    """
+    qn = connection.ops.quote_name
+    item, product = qn(CartItem._meta.db_table), qn(Product._meta.db_table)
+    return (
+        f"INSERT INTO {item} (user_id, product_id, quantity) "
+        f"SELECT %s, id, %s FROM {product} WHERE id = %s AND stock >= %s "
+        f"ON CONFLICT (user_id, product_id) DO UPDATE SET quantity = {item}.quantity + excluded.quantity "
+        f"WHERE {item}.quantity + excluded.quantity <= (SELECT stock FROM {product} WHERE id = excluded.product_id) "
+        f"RETURNING (SELECT name FROM {product} WHERE id = {item}.product_id)"
+    )
+
+
+def _increment(user, product_id, quantity):
+    """UPDATE ... SET quantity = quantity + n WHERE stock >= quantity + n; rows updated."""
+    # stock - n would go negative, which MySQL's unsigned column rejects outright
+    stock = Product.objects.filter(pk=OuterRef("product_id")).values("stock")
+    return CartItem.objects.alias(stock=Subquery(stock)).filter(
+        user=user, product_id=product_id, stock__gte=F("quantity") + quantity
+    ).update(quantity=F("quantity") + quantity)
+
+
+def add_to_cart(user, product_id, quantity):
+    """
+    Add quantity of a product to user's cart atomically, keeping the cart
+    line within the product's stock. Concurrent adds of the same product
+    each count once and never create a second row (see the unique
+    constraint on CartItem).
+
+    On SQLite and PostgreSQL this is a single INSERT ... ON CONFLICT DO
+    UPDATE. Elsewhere, MySQL included, it is a guarded F() update,
+    falling back to an insert when the product is not in the cart yet:
+    MySQL connections report found rather than changed rows, so an
+    ON DUPLICATE KEY UPDATE the stock guard turned into a no-op would
+    look like a success. Returns the product's
+    name; raises CartError when the product does not exist or stock is
+    short.
+    """
+    if connection.vendor in ("sqlite", "postgresql"):
+        with connection.cursor() as cursor:
+            cursor.execute(_upsert_sql(), [user.pk, quantity, product_id, quantity])
+            row = cursor.fetchone()
+        if row is not None:
+            return row[0]
+    elif _increment(user, product_id, quantity):
+        return Product.objects.values_list("name", flat=True).get(pk=product_id)
+
+    product = Product.objects.filter(pk=product_id).values_list("stock", "name").first()
+    if product is None:
+        raise CartError("Product not found", status=404)
+    stock, name = product
+    if stock >= quantity and connection.vendor not in ("sqlite", "postgresql"):
+        try:
+            with transaction.atomic():
+                CartItem.objects.create(user=user, product_id=product_id, quantity=quantity)
+            return name
+        except IntegrityError:
+            # already in the cart (possibly added concurrently): add to it instead
+            if _increment(user, product_id, quantity):
+                return name
+    raise CartError("Not enough stock available")
+
+
+def _parse_operation(entry):
+    """One {product_id, op?, quantity?} entry as (product_id, op, quantity)."""
+    if not isinstance(entry, dict):
+        raise CartError("Expected an object.")
+    op = entry.get("op", "set")
+    if op not in SYNC_OPS:
+        raise CartError(f"op must be one of {', '.join(SYNC_OPS)}")
+    product_id = positive_int(entry.get("product_id"), "product_id")
+    if op == "remove":
+        return product_id, op, 0
+    # set to 0 removes the line
+    return product_id, op, positive_int(entry.get("quantity"), "quantity", minimum=0 if op == "set" else 1)
+
+
+def sync_cart(user, operations):
+    """
+    Apply [{product_id, op, quantity}, ...] to user's cart, op being
+    "set" (the default), "increment" or "remove". Operations on the same
+    product apply in order. Stock for every product is read with one
+    in_bulk query, and the cart is rewritten with one bulk create, update
+    and delete in one transaction. Either every operation applies or,
+    with CartError listing {index, error} per bad entry, none does.
+    """
+    if not isinstance(operations, list):
+        raise CartError("Expected a list of operations.")
+    if len(operations) > MAX_SYNC_OPERATIONS:
+        raise CartError(f"At most {MAX_SYNC_OPERATIONS} operations per request.")
+    parsed, errors = [], []
+    for index, entry in enumerate(operations):
+        try:
+            parsed.append((index, *_parse_operation(entry)))
+        except CartError as exc:
+            errors.append({"index": index, "error": str(exc)})
+    if errors:
+        raise CartError("Invalid operations", errors=errors)
+
+    with transaction.atomic():
+        products = Product.objects.only("id", "stock").in_bulk({pk for _, pk, _, _ in parsed})
+        items = {item.product_id: item for item in CartItem.objects.select_for_update().filter(user=user)}
+        quantities = {pk: item.quantity for pk, item in items.items()}
+        last_index = {}
+        for index, pk, op, quantity in parsed:
+            if pk not in products:
+                if op != "remove":
+                    errors.append({"index": index, "error": "Product not found"})
+                continue
+            quantities[pk] = quantity if op != "increment" else quantities.get(pk, 0) + quantity
+            last_index[pk] = index
+        for pk, index in last_index.items():
+            if quantities[pk] > products[pk].stock:
+                errors.append({"index": index, "error": f"Only {products[pk].stock} in stock"})
+        if errors:
+            raise CartError("Invalid operations", errors=sorted(errors, key=lambda error: error["index"]))
+
+        created, updated, deleted = [], [], []
+        for pk in last_index:
+            item, quantity = items.get(pk), quantities[pk]
+            if item is None:
+                if quantity:
+                    created.append(CartItem(user=user, product_id=pk, quantity=quantity))
+            elif not quantity:
+                deleted.append(item.pk)
+            elif quantity != item.quantity:
+                item.quantity = quantity
+                updated.append(item)
+        try:
+            with transaction.atomic():
+                CartItem.objects.bulk_create(created)
+        except IntegrityError:
+            raise CartError("The cart changed during the sync; retry.", status=409)
+        CartItem.objects.bulk_update(updated, ["quantity"])
+        CartItem.objects.filter(pk__in=deleted).delete()
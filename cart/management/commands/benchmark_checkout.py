@@ -0,0 +1,112 @@
+import random
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.utils import timezone
+
+from cart.checkout import CheckoutError, place_order
+from cart.models import CartItem, Order
+from products.bulk import db_price, insert_rows
+from products.models import Product
+
+SKU_PREFIX = "CHECKOUT-BENCH-"
+
+
+class Command(BaseCommand):
+    help = (
+        "Run checkouts from many threads against a few scarce products and check "
+        "that stock never goes negative and matches what was ordered. Creates its "
+        "own products and users and deletes them afterwards; point it at a "
+        "development database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--orders", type=int, default=50, help="checkout attempts per thread")
+        parser.add_argument("--products", type=int, default=5)
+        parser.add_argument("--stock", type=int, default=100, help="initial stock per product")
+        parser.add_argument("--items", type=int, default=2, help="products per order")
+
+    def handle(self, *args, **options):
+        if options["items"] > options["products"]:
+            raise CommandError("--items cannot exceed --products")
+        self.options = options
+        self.setup()
+        try:
+            self.run()
+        finally:
+            Order.objects.filter(user__in=self.users).delete()
+            CartItem.objects.filter(user__in=self.users).delete()
+            get_user_model().objects.filter(pk__in=[u.pk for u in self.users]).delete()
+            Product.objects.filter(pk__in=self.product_ids).delete()
+
+    def setup(self):
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        insert_rows(Product, ["name", "slug", "sku", "description", "price", "stock", "is_active",
+                              "created_at", "updated_at"],
+                    [(f"Checkout bench {i}", f"checkout-bench-{i}", f"{SKU_PREFIX}{i}", "", db_price(9.99),
+                      self.options["stock"], True, now, now) for i in range(self.options["products"])])
+        self.product_ids = list(Product.objects.filter(sku__startswith=SKU_PREFIX).values_list("pk", flat=True))
+        User = get_user_model()
+        self.users = [User.objects.create(username=f"checkout-bench-{i}") for i in range(self.options["threads"])]
+
+    def run(self):
+        self.lock = threading.Lock()
+        self.ordered = dict.fromkeys(self.product_ids, 0)
+        self.placed = self.rejected = self.retries = 0
+        threads = [threading.Thread(target=self.worker, args=(user, random.Random(user.pk))) for user in self.users]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        stock = dict(Product.objects.filter(pk__in=self.product_ids).values_list("pk", "stock"))
+        problems = [
+            f"product {pk}: stock {stock[pk]}, expected {self.options['stock'] - units}"
+            for pk, units in self.ordered.items() if stock[pk] != self.options["stock"] - units or stock[pk] < 0
+        ]
+        attempts = self.placed + self.rejected
+        self.stdout.write(
+            f"{self.options['threads']} threads, {attempts} checkouts in {elapsed:.2f} s: "
+            f"{self.placed} placed ({self.placed / elapsed:.0f} orders/s), {self.rejected} out of stock, "
+            f"{self.retries} retried after lock errors"
+        )
+        self.stdout.write(f"stock left: {sorted(stock.values())}")
+        if problems:
+            raise CommandError("oversold or lost stock:\n" + "\n".join(problems))
+        self.stdout.write(self.style.SUCCESS("no overselling"))
+
+    def worker(self, user, rng):
+        try:
+            for _ in range(self.options["orders"]):
+                picked = {pk: rng.randint(1, 3) for pk in rng.sample(self.product_ids, self.options["items"])}
+                while True:
+                    CartItem.objects.filter(user=user).delete()
+                    insert_rows(CartItem, ["user_id", "product_id", "quantity"],
+                                [(user.pk, pk, qty) for pk, qty in picked.items()])
+                    try:
+                        place_order(user)
+                    except CheckoutError:
+                        outcome = "rejected"
+                    except OperationalError:
+                        # SQLite "database is locked", MySQL deadlocks: try the same cart again
+                        with self.lock:
+                            self.retries += 1
+                        continue
+                    else:
+                        outcome = "placed"
+                    break
+                with self.lock:
+                    if outcome == "placed":
+                        self.placed += 1
+                        for pk, qty in picked.items():
+                            self.ordered[pk] += qty
+                    else:
+                        self.rejected += 1
+        finally:
+            connection.close()
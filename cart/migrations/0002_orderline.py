@@ -0,0 +1,65 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_order_lines(apps, schema_editor):
+    """
+    Lines for the cart items orders still point at, priced at the
+    product's current price: checkout deleted the cart items, so most old
+    orders have nothing left to copy.
+    """
+    Order = apps.get_model("cart", "Order")
+    OrderLine = apps.get_model("cart", "OrderLine")
+    links = (
+        Order.items.through.objects.select_related("cartitem__product")
+        .order_by("order_id", "cartitem_id")
+        .iterator(chunk_size=1000)
+    )
+    lines = []
+    for link in links:
+        item = link.cartitem
+        lines.append(OrderLine(
+            order_id=link.order_id,
+            product_id=item.product_id,
+            product_name=item.product.name,
+            unit_price=item.product.price,
+            quantity=item.quantity,
+            line_total=item.product.price * item.quantity,
+        ))
+        if len(lines) == 1000:
+            OrderLine.objects.bulk_create(lines)
+            lines = []
+    OrderLine.objects.bulk_create(lines)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0001_initial'),
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_name', models.CharField(max_length=255)),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('quantity', models.PositiveIntegerField()),
+                ('line_total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='cart.order')),
+                ('product', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='order_lines', to='products.product')),
+            ],
+            options={
+                'ordering': ('id',),
+            },
+        ),
+        migrations.RunPython(backfill_order_lines, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='order',
+            name='items',
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def merge_duplicate_items(apps, schema_editor):
+    """Fold repeated (user, product) rows into the oldest one, summing quantities."""
+    CartItem = apps.get_model("cart", "CartItem")
+    duplicates = (
+        CartItem.objects.values("user_id", "product_id")
+        .annotate(rows=models.Count("id"), keep=models.Min("id"), quantity=models.Sum("quantity"))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for group in list(duplicates):
+        rows = CartItem.objects.filter(user_id=group["user_id"], product_id=group["product_id"])
+        rows.filter(id=group["keep"]).update(quantity=group["quantity"])
+        rows.exclude(id=group["keep"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0002_orderline'),
+        ('products', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('user', 'product'), name='cart_cartitem_unique_user_product'),
+        ),
+    ]
@@ -5,11 +5,34 @@ from products.models import Product
 
 User = settings.AUTH_USER_MODEL
 
+LINE_TOTAL = models.ExpressionWrapper(
+    models.F("quantity") * models.F("product__price"),
+    output_field=models.DecimalField(max_digits=12, decimal_places=2),
+)
+
+
+class CartItemQuerySet(models.QuerySet):
+    def with_totals(self):
+        # products joined in and line_total computed by the database
+        return self.select_related("product").annotate(line_total=LINE_TOTAL)
+
+    def total(self):
+        return self.aggregate(total=models.Sum(LINE_TOTAL))["total"] or 0
+
+
 class CartItem(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="cart_items")
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
 
+    objects = CartItemQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # one line per product; AddToCart adds to it in place
+            models.UniqueConstraint(fields=["user", "product"], name="cart_cartitem_unique_user_product"),
+        ]
+
     def __str__(self):
         return f"{self.quantity} x {self.product.name}"
 
@@ -26,10 +49,32 @@ class Order(models.Model):
     )
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="orders")
-    items = models.ManyToManyField(CartItem)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="Pending")
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"Order #{self.id} - {self.user.username}"
+
+
+class OrderLine(models.Model):
+    """
+    What was bought, as it was at checkout: later changes to the product,
+    or its deletion, do not alter past orders.
+    """
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="lines")
+    # kept as a bare id so the line outlives the product
+    product = models.ForeignKey(
+        Product, on_delete=models.DO_NOTHING, db_constraint=False, related_name="order_lines"
+    )
+    product_name = models.CharField(max_length=255)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.PositiveIntegerField()
+    line_total = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        ordering = ("id",)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_name}"
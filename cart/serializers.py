@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import CartItem, Order
+from .models import CartItem, Order, OrderLine
 from products.models import Product
 
 
@@ -11,19 +11,36 @@ class ProductSerializer(serializers.ModelSerializer):
 
 class CartItemSerializer(serializers.ModelSerializer):
     product = ProductSerializer()
+    total_price = serializers.SerializerMethodField()
 
     class Meta:
         model = CartItem
-        fields = ["id", "product", "quantity"]
+        fields = ["id", "product", "quantity", "total_price"]
 
-    def to_representation(self, instance):
-        data = super().to_representation(instance)
-        data["total_price"] = float(instance.total_price())
-        return data
+    def get_total_price(self, obj):
+        line_total = getattr(obj, "line_total", None)
+        return float(obj.total_price() if line_total is None else line_total)
+
+
+class OrderLineSerializer(serializers.ModelSerializer):
+    """An OrderLine in the same shape as the CartItem it was bought as."""
+
+    product = serializers.SerializerMethodField()
+    total_price = serializers.SerializerMethodField()
+
+    class Meta:
+        model = OrderLine
+        fields = ["id", "product", "quantity", "total_price"]
+
+    def get_product(self, obj):
+        return {"id": obj.product_id, "name": obj.product_name, "price": f"{obj.unit_price:.2f}"}
+
+    def get_total_price(self, obj):
+        return float(obj.line_total)
 
 
 class OrderSerializer(serializers.ModelSerializer):
-    items = CartItemSerializer(many=True)
+    items = OrderLineSerializer(source="lines", many=True)
 
     class Meta:
         model = Order
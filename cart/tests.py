@@ -1,3 +1,193 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from products.models import Product
+from .items import _increment
+from .models import CartItem, Order, OrderLine
+
+
+class ViewCartTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username="shopper")
+        cls.products = [
+            Product.objects.create(name=f"Chair {i}", price=f"{i}.10", stock=10) for i in range(1, 21)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def fill_cart(self, size):
+        CartItem.objects.bulk_create(
+            [CartItem(user=self.user, product=p, quantity=3) for p in self.products[:size]]
+        )
+
+    def test_query_count_does_not_grow_with_the_cart(self):
+        for size in (1, 20):
+            CartItem.objects.all().delete()
+            self.fill_cart(size)
+            with self.assertNumQueries(2):
+                response = self.client.get("/cart/cart/view/")
+            self.assertEqual(len(response.json()["cart"]), size)
+
+    def test_totals(self):
+        self.fill_cart(3)
+        data = self.client.get("/cart/cart/view/").json()
+        self.assertEqual(sorted(item["total_price"] for item in data["cart"]), [3.3, 6.3, 9.3])
+        self.assertEqual(data["total_amount"], 18.9)
+        self.assertEqual(data["cart"][0]["product"].keys(), {"id", "name", "price"})
+
+    def test_empty_cart(self):
+        data = self.client.get("/cart/cart/view/").json()
+        self.assertEqual(data, {"cart": [], "total_amount": 0.0})
+
+
+class AddToCartTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username="shopper")
+        cls.product = Product.objects.create(name="Chair", price="10.00", stock=5)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add(self, **data):
+        return self.client.post("/cart/cart/add/", data, format="json")
+
+    def test_add_is_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.add(product_id=self.product.pk, quantity=2)
+        self.assertEqual(response.json()["product"], "Chair")
+        self.assertEqual(CartItem.objects.get().quantity, 2)
+
+    def test_invalid_numbers_are_rejected(self):
+        for value in ("²", "abc", "-1", 0, 2**31, 10**30, True, [1]):
+            self.assertEqual(self.add(product_id=self.product.pk, quantity=value).status_code, 400, value)
+            self.assertEqual(self.add(product_id=value).status_code, 400, value)
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_numeric_strings(self):
+        response = self.add(product_id=str(self.product.pk), quantity="3")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(CartItem.objects.get().quantity, 3)
+
+    def test_out_of_stock(self):
+        self.assertEqual(self.add(product_id=self.product.pk, quantity=6).status_code, 400)
+        self.assertEqual(self.add(product_id=self.product.pk + 1).status_code, 404)
+
+    def test_sync_rejects_invalid_numbers(self):
+        response = self.client.post(
+            "/cart/cart/sync/",
+            [{"product_id": self.product.pk, "quantity": "²"}, {"product_id": 2**40, "quantity": 1}],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error["index"] for error in response.json()["errors"]], [0, 1])
+
+    def test_increment_guard(self):
+        # the fallback path other databases take
+        CartItem.objects.create(user=self.user, product=self.product, quantity=2)
+        self.assertEqual(_increment(self.user, self.product.pk, 10), 0)
+        self.assertEqual(_increment(self.user, self.product.pk, 3), 1)
+        self.assertEqual(CartItem.objects.get().quantity, 5)
+
+
+class CheckoutTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.first, cls.second = User.objects.create(username="first"), User.objects.create(username="second")
+        cls.last_one = Product.objects.create(name="Last chair", price="40.00", stock=1)
+        cls.plenty = Product.objects.create(name="Stool", price="12.50", stock=10)
+
+    def checkout(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post("/cart/cart/checkout/")
+
+    def test_order_lines_snapshot_the_cart(self):
+        CartItem.objects.create(user=self.first, product=self.last_one, quantity=1)
+        CartItem.objects.create(user=self.first, product=self.plenty, quantity=3)
+        self.assertEqual(self.checkout(self.first).status_code, 200)
+        order = Order.objects.get()
+        self.assertEqual(order.total_amount, Decimal("77.50"))
+        lines = {line.product_id: line for line in OrderLine.objects.filter(order=order)}
+        self.assertEqual(lines[self.plenty.pk].product_name, "Stool")
+        self.assertEqual(lines[self.plenty.pk].unit_price, Decimal("12.50"))
+        self.assertEqual(lines[self.plenty.pk].quantity, 3)
+        self.assertEqual(lines[self.plenty.pk].line_total, Decimal("37.50"))
+        self.assertEqual(lines[self.last_one.pk].line_total, Decimal("40.00"))
+        self.assertFalse(CartItem.objects.filter(user=self.first).exists())
+        self.assertEqual(Product.objects.get(pk=self.plenty.pk).stock, 7)
+
+    def test_last_unit_sells_once(self):
+        # both carts were filled while the unit was still there
+        for user in (self.first, self.second):
+            CartItem.objects.create(user=user, product=self.last_one, quantity=1)
+            CartItem.objects.create(user=user, product=self.plenty, quantity=2)
+        self.assertEqual(self.checkout(self.first).status_code, 200)
+        response = self.checkout(self.second)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Last chair", response.json()["error"])
+        # nothing of the failed checkout is written
+        self.assertEqual(Order.objects.filter(user=self.second).count(), 0)
+        self.assertEqual(CartItem.objects.filter(user=self.second).count(), 2)
+        self.assertEqual(Product.objects.get(pk=self.last_one.pk).stock, 0)
+        self.assertEqual(Product.objects.get(pk=self.plenty.pk).stock, 8)
+
+    def test_empty_cart(self):
+        self.assertEqual(self.checkout(self.first).status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+
+class SyncCartTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username="shopper")
+        cls.chair = Product.objects.create(name="Chair", price="10.00", stock=5)
+        cls.stool = Product.objects.create(name="Stool", price="5.00", stock=2)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        CartItem.objects.create(user=self.user, product=self.chair, quantity=1)
+
+    def sync(self, body):
+        return self.client.post("/cart/cart/sync/", body, format="json")
+
+    def cart(self):
+        return dict(CartItem.objects.filter(user=self.user).values_list("product_id", "quantity"))
+
+    def test_applies_in_order(self):
+        response = self.sync({"operations": [
+            {"product_id": self.chair.pk, "op": "increment", "quantity": 2},
+            {"product_id": self.stool.pk, "quantity": 2},
+            {"product_id": self.chair.pk, "op": "increment", "quantity": 1},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cart(), {self.chair.pk: 4, self.stool.pk: 2})
+        self.assertEqual(response.json()["total_amount"], 50.0)
+
+    def test_all_or_nothing(self):
+        response = self.sync([
+            {"product_id": self.chair.pk, "quantity": 3},
+            {"product_id": self.stool.pk, "quantity": 3},
+            {"product_id": self.stool.pk + 100, "quantity": 1},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error["index"] for error in response.json()["errors"]], [1, 2])
+        self.assertEqual(self.cart(), {self.chair.pk: 1})
+
+    def test_remove(self):
+        self.assertEqual(self.sync([{"product_id": self.chair.pk, "op": "remove"}]).status_code, 200)
+        self.assertEqual(self.cart(), {})
 
-# Create your tests here.
+    def test_bodies_that_are_not_a_list_or_object(self):
+        for body in ("chair", 3, None, {"operations": "chair"}):
+            self.assertEqual(self.sync(body).status_code, 400, body)
+        self.assertEqual(self.cart(), {self.chair.pk: 1})
@@ -1,10 +1,14 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from .checkout import CheckoutError, place_order
+from .items import CartError, add_to_cart, positive_int, sync_cart
 from .models import CartItem, Order
-from products.models import Product
+from products.compiled import CompiledSerializer
 from .serializers import CartItemSerializer, OrderSerializer
 from rest_framework.decorators import api_view, permission_classes
+from OAKSLAND.pagination import KeysetPagination
+from OAKSLAND.renderers import JSONRenderer, StreamingJSONResponse
 
 
 # -------------------- ADD TO CART --------------------
@@ -13,42 +17,48 @@ class AddToCart(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        product_id = request.data.get("product_id")
-        quantity = request.data.get("quantity", 1)
+        try:
+            product_id = positive_int(request.data.get("product_id"), "product_id")
+            quantity = positive_int(request.data.get("quantity", 1), "quantity")
+            name = add_to_cart(request.user, product_id, quantity)
+        except CartError as exc:
+            return Response({"error": str(exc)}, status=exc.status)
+        return Response({"message": "Product added to cart", "product": name})
+
+
+# -------------------- SYNC CART --------------------
+class SyncCart(APIView):
+    """
+    Replay an offline cart in one request: a list of {product_id, op,
+    quantity} (op "set", "increment" or "remove"), or {"operations": [...]}.
+    Responds with the resulting cart, like ViewCart.
+    """
+    permission_classes = [IsAuthenticated]
 
+    def post(self, request):
+        operations = request.data.get("operations") if isinstance(request.data, dict) else request.data
         try:
-            product = Product.objects.get(id = product_id)
-        except Product.DoesNotExist:
-            return Response({"error": "Product not found"}, status=404)
-        
-        if product.stock < quantity:
-            return Response({"error": "Not enough stock available"}, status=400)
-        
-        cart_item, created = CartItem.objects.get_or_create(
-            user=request.user, product=product
-        )
-        if not created:
-            # New total if updating existing cart item
-            new_quantity = cart_item.quantity + quantity
-            if product.stock < new_quantity:
-                return Response({"error": "Not enough stock available"}, status=400)
-            cart_item.quantity = new_quantity
-        else:
-            cart_item.quantity = quantity
-
-        cart_item.save()
-        return Response({"message": "Product added to cart", "product": product.name})
+            sync_cart(request.user, operations)
+        except CartError as exc:
+            body = {"error": str(exc)}
+            if exc.errors:
+                body["errors"] = exc.errors
+            return Response(body, status=exc.status)
+        return Response(cart_data(request.user))
 
 
 # -------------------- VIEW CART --------------------
+def cart_data(user):
+    cart_items = CartItem.objects.filter(user=user)
+    data = CompiledSerializer(CartItemSerializer).many(cart_items.with_totals())
+    return {"cart": data, "total_amount": float(cart_items.total())}
+
+
 class ViewCart(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        cart_items = CartItem.objects.filter(user=request.user)
-        serializer = CartItemSerializer(cart_items, many=True)
-        total = sum([item.total_price() for item in cart_items])
-        return Response({"cart": serializer.data, "total_amount": float(total)})
+        return Response(cart_data(request.user))
 
 
 # -------------------- CHECKOUT --------------------
@@ -56,30 +66,10 @@ class Checkout(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        cart_items = CartItem.objects.filter(user=request.user)
-        if not cart_items.exists():
-            return Response({"error": "Cart is empty"}, status=400)
-
-        # Verify stock before placing order
-        for item in cart_items:
-            if item.quantity > item.product.stock:
-                return Response(
-                    {"error": f"Not enough stock for {item.product.name}"},
-                    status=400
-                )
-
-        total = sum([item.total_price() for item in cart_items])
-        order = Order.objects.create(user=request.user, total_amount=total)
-        order.items.set(cart_items)
-        order.save()
-
-        # Reduce stock
-        for item in cart_items:
-            item.product.stock -= item.quantity
-            item.product.save()
-
-        # Clear cart
-        cart_items.delete()
+        try:
+            order = place_order(request.user)
+        except CheckoutError as exc:
+            return Response({"error": str(exc)}, status=400)
 
         serializer = OrderSerializer(order)
         return Response({"message": "Order placed successfully", "order": serializer.data})
@@ -91,9 +81,24 @@ class OrderHistory(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        orders = Order.objects.filter(user=request.user).order_by("-created_at")
-        serializer = OrderSerializer(orders, many=True)
-        return Response({"orders": serializer.data})
+        orders = Order.objects.filter(user=request.user).prefetch_related("lines").order_by("-created_at")
+        if KeysetPagination.cursor_query_param in request.query_params:
+            paginator = KeysetPagination()
+            page = paginator.paginate_queryset(orders, request, view=self)
+            return Response({
+                "orders": CompiledSerializer(OrderSerializer).many(page),
+                "next": paginator.get_next_link(),
+                "previous": paginator.get_previous_link(),
+            })
+        if isinstance(request.accepted_renderer, JSONRenderer):
+            # full history: stream it rather than building one big list
+            orders = orders.iterator(chunk_size=500)
+            return StreamingJSONResponse(
+                {"orders": map(CompiledSerializer(OrderSerializer).to_representation, orders)},
+                "orders",
+                renderer=request.accepted_renderer,
+            )
+        return Response({"orders": CompiledSerializer(OrderSerializer).many(orders)})
 
 
 
@@ -0,0 +1,230 @@
+import datetime
+import gc
+import heapq
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Count
+
+from .cache import get_version
+from .models import Category, Product
+from .search import tokenize
+
+# rows committed late can carry an updated_at just behind the watermark
+OVERLAP = datetime.timedelta(seconds=60)
+BLOCK = 64
+# sorts after every continuation of a prefix
+PREFIX_END = chr(0x10FFFF)
+
+
+def normalize(text):
+    """Lowercase words without accents or punctuation: "Café-Chair 2" -> "cafe chair 2"."""
+    text = unicodedata.normalize("NFKD", text or "")
+    return " ".join(tokenize("".join(c for c in text if not unicodedata.combining(c))))
+
+
+def keys_for(*texts):
+    """Every word start of each text, so "oak dining chair" is found by "din" and "cha"."""
+    keys = set()
+    for text in texts:
+        words = normalize(text).split(" ")
+        keys.update(" ".join(words[i:]) for i in range(len(words)) if words[i])
+    return keys
+
+
+def _popularity(ids=None, related=None):
+    """
+    {product or category id: rows referencing it} summed over
+    PRODUCT_POPULARITY_SOURCES, which lists (model label, product field).
+    """
+    counts = {}
+    for label, field in settings.PRODUCT_POPULARITY_SOURCES:
+        path = f"{field}__{related}" if related else field
+        rows = apps.get_model(label).objects.all()
+        if ids is not None:
+            rows = rows.filter(**{f"{path}__in": ids})
+        for pk, n in rows.exclude(**{path: None}).values_list(path).annotate(n=Count("pk")).order_by():
+            counts[pk] = counts.get(pk, 0) + n
+    return counts
+
+
+class PrefixIndex:
+    """
+    Keys sorted for bisect, with a score and an item per key. Keys with a
+    common prefix are one contiguous range; the best-scoring entries of a
+    range come from a heap over per-block maxima, so a short prefix that
+    matches half the catalog costs a few thousand heap entries, not a scan.
+    """
+
+    def __init__(self, entries):
+        entries = sorted(entries, key=lambda entry: entry[0])
+        self.entries = entries
+        self.keys = [key for key, _score, _item in entries]
+        self.scores = [score for _key, score, _item in entries]
+        self.items = [item for _key, _score, item in entries]
+        self.block_max = [max(self.scores[i:i + BLOCK]) for i in range(0, len(entries), BLOCK)]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def ranked(self, prefix):
+        """Yield (-score, key, item) for keys starting with prefix, best first, ties by key."""
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + PREFIX_END, lo)
+        if lo == hi:
+            return
+        scores = self.scores
+        first, last = -(-lo // BLOCK), hi // BLOCK
+        # (-score, position, is_entry): a block sorts before the entries it holds
+        heap = [(-scores[i], i, 1) for i in range(lo, min(hi, first * BLOCK))]
+        if first <= last:
+            heap += [(-self.block_max[b], b * BLOCK, 0) for b in range(first, last)]
+            heap += [(-scores[i], i, 1) for i in range(last * BLOCK, hi)]
+        heapq.heapify(heap)
+        while heap:
+            negative, i, is_entry = heapq.heappop(heap)
+            if is_entry:
+                yield negative, self.keys[i], self.items[i]
+            else:
+                for j in range(i, i + BLOCK):
+                    heapq.heappush(heap, (-scores[j], j, 1))
+
+
+class Autocomplete:
+    """
+    Prefix index over active product names and SKUs and active category
+    names, ranked by popularity. Products changed since the full build
+    sit in a small overlay index that shadows their old entries, so a
+    catalog write costs a query over the changed rows rather than a
+    rebuild. Immutable like CatalogSnapshot: refreshed() returns a new one.
+    """
+
+    def __init__(self, products, categories, product_ids, watermark, versions,
+                 overlay=(), shadowed=frozenset(), built_at=None):
+        self.products = products
+        self.categories = categories
+        self.product_ids = product_ids
+        self.watermark = watermark
+        self.versions = versions
+        self.overlay = PrefixIndex(overlay)
+        self.shadowed = shadowed
+        self.built_at = time.monotonic() if built_at is None else built_at
+        self.refreshed_at = time.monotonic()
+
+    @staticmethod
+    def product_entries(rows, popularity):
+        entries = []
+        for pk, name, sku, slug in rows:
+            item = ("product", pk, name, slug)
+            score = popularity.get(pk, 0)
+            entries += [(key, score, item) for key in keys_for(name, sku)]
+        return entries
+
+    @staticmethod
+    def category_index():
+        popularity = _popularity(related="categories")
+        rows = Category.objects.filter(is_active=True).values_list("pk", "name", "slug")
+        return PrefixIndex(
+            (key, popularity.get(pk, 0), ("category", pk, name, slug))
+            for pk, name, slug in rows for key in keys_for(name)
+        )
+
+    @classmethod
+    def build(cls, versions):
+        start = Product.objects.order_by("-updated_at").values_list("updated_at", flat=True).first()
+        rows = list(Product.objects.active().values_list("pk", "name", "sku", "slug").iterator(chunk_size=10000))
+        products = PrefixIndex(cls.product_entries(rows, _popularity()))
+        # the collector stops tracking the index's millions of tuples after
+        # one full pass; take that pass here instead of in a later request
+        gc.collect()
+        return cls(products, cls.category_index(), frozenset(pk for pk, *_ in rows), start, versions)
+
+    def refreshed(self, versions):
+        """
+        Index rows whose updated_at moved since the last refresh into the
+        overlay. Deletes leave no updated_at behind; an active-row count
+        that no longer adds up means a diff against the current ids. The
+        whole index is rebuilt once the overlay outgrows
+        PRODUCT_AUTOCOMPLETE_OVERLAY_RATIO of it or it is older than
+        PRODUCT_AUTOCOMPLETE_REBUILD_INTERVAL, which also re-ranks by
+        current popularity.
+        """
+        if time.monotonic() - self.built_at > settings.PRODUCT_AUTOCOMPLETE_REBUILD_INTERVAL:
+            return type(self).build(versions)
+        categories = self.categories
+        if versions[1] != self.versions[1]:
+            categories = self.category_index()
+
+        changed = Product.objects.values_list("pk", "name", "sku", "slug", "is_active", "updated_at")
+        if self.watermark is not None:
+            changed = changed.filter(updated_at__gte=self.watermark - OVERLAP)
+        changed = list(changed)
+        watermark = max(filter(None, [self.watermark] + [row[5] for row in changed]), default=None)
+        changed_ids = {row[0] for row in changed}
+        overlay = [entry for entry in self.overlay.entries if entry[2][1] not in changed_ids]
+        indexed = {entry[2][1] for entry in overlay}
+        active = [row[:4] for row in changed if row[4]]
+        if len(indexed) + len(active) > max(1000, len(self.product_ids) * settings.PRODUCT_AUTOCOMPLETE_OVERLAY_RATIO):
+            return type(self).build(versions)
+        overlay += self.product_entries(active, _popularity(ids=[row[0] for row in active]))
+        indexed.update(row[0] for row in active)
+        shadowed = self.shadowed | (changed_ids & self.product_ids)
+
+        # shadowed only ever holds ids from product_ids
+        if len(self.product_ids) - len(shadowed) + len(indexed) != Product.objects.active().count():
+            current = set(Product.objects.active().values_list("pk", flat=True).iterator(chunk_size=10000))
+            shadowed |= self.product_ids - current
+            overlay = [entry for entry in overlay if entry[2][1] in current]
+        return type(self)(self.products, categories, self.product_ids, watermark, versions,
+                          overlay, frozenset(shadowed), self.built_at)
+
+    def suggest(self, query, limit=10):
+        """Up to limit (kind, id, name, slug) items whose name or SKU has a word starting with query."""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        shadowed = self.shadowed
+        main = (entry for entry in self.products.ranked(prefix) if entry[2][1] not in shadowed)
+        seen, results = set(), []
+        for _score, _key, item in heapq.merge(main, self.overlay.ranked(prefix), self.categories.ranked(prefix)):
+            if item[:2] not in seen:
+                seen.add(item[:2])
+                results.append(item)
+                if len(results) == limit:
+                    break
+        return results
+
+
+_lock = threading.Lock()
+_index = None
+
+
+def get_autocomplete():
+    """
+    This process's index, built on first use and brought up to date when
+    the catalog or category version has moved (at most every
+    PRODUCT_AUTOCOMPLETE_MIN_REFRESH seconds). While one thread refreshes,
+    others keep answering from the previous index.
+    """
+    global _index
+    versions = (get_version("catalog"), get_version("categories"))
+    index = _index
+    if index is not None and (
+        index.versions == versions
+        or time.monotonic() - index.refreshed_at < settings.PRODUCT_AUTOCOMPLETE_MIN_REFRESH
+    ):
+        return index
+    if not _lock.acquire(blocking=index is None):
+        return index
+    try:
+        if _index is None:
+            _index = Autocomplete.build(versions)
+        elif _index.versions != versions:
+            _index = _index.refreshed(versions)
+        return _index
+    finally:
+        _lock.release()
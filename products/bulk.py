@@ -0,0 +1,191 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.validators import DecimalValidator
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Product
+
+PRICE_FIELD = Product._meta.get_field("price")
+PRICE_VALIDATOR = DecimalValidator(PRICE_FIELD.max_digits, PRICE_FIELD.decimal_places)
+# the largest stock a PositiveIntegerField holds on every backend
+MAX_STOCK = 2**31 - 1
+
+
+def insert_rows(model, columns, rows):
+    """
+    executemany INSERT of already db-prepared tuples. bulk_create spends
+    most of its time preparing and compiling each row, which caps bulk
+    writes well below what the database can take.
+    """
+    if not rows:
+        return
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {qn(model._meta.db_table)} ({', '.join(map(qn, columns))}) "
+            f"VALUES ({', '.join(['%s'] * len(columns))})",
+            rows,
+        )
+
+
+def update_rows(model, columns, rows):
+    """
+    executemany UPDATE ... WHERE pk = %s; each row ends with the pk.
+    bulk_update's CASE WHEN pk = ... chains are evaluated per row and
+    scale quadratically with the batch on SQLite.
+    """
+    if not rows:
+        return
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {qn(model._meta.db_table)} SET {', '.join(f'{qn(c)} = %s' for c in columns)} "
+            f"WHERE {qn(model._meta.pk.column)} = %s",
+            rows,
+        )
+
+
+def db_price(value):
+    return connection.ops.adapt_decimalfield_value(value, PRICE_FIELD.max_digits, PRICE_FIELD.decimal_places)
+
+
+def delete_rows(model, column, ids):
+    # raw DELETE: the ORM would load every row to send post_delete signals
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            cursor.execute(
+                f"DELETE FROM {qn(model._meta.db_table)} WHERE {qn(column)} IN ({', '.join(['%s'] * len(chunk))})",
+                chunk,
+            )
+
+
+def _parse_int(value):
+    """value as an int (JSON integer or decimal string), or None."""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        return None
+    if isinstance(value, str) and not value.strip().removeprefix("-").isdecimal():
+        return None
+    return int(value)
+
+
+def _parse_update(entry):
+    """Validate one {id|sku, price?, stock?, stock_delta?} entry."""
+    if not isinstance(entry, dict):
+        raise ValueError({"non_field_errors": ["Expected an object."]})
+    errors = {}
+    pk = sku = None
+    if entry.get("id") is not None:
+        pk = _parse_int(entry["id"])
+        # past the BigAutoField range the lookup itself would overflow
+        if pk is None or not 0 < pk < 2**63:
+            errors["id"] = ["A valid positive integer is required."]
+    elif not isinstance(entry.get("sku"), bool) and isinstance(entry.get("sku"), (int, str)):
+        # JSON numbers are looked up as the sku text the import stores
+        sku = str(entry["sku"]).strip() or None
+    if entry.get("id") is None and sku is None:
+        errors["id"] = ["Either id or sku is required."]
+    if "stock" in entry and "stock_delta" in entry:
+        errors["stock_delta"] = ["Give stock or stock_delta, not both."]
+    price = stock = delta = None
+    if entry.get("price") is not None:
+        try:
+            price = Decimal(str(entry["price"]))
+            PRICE_VALIDATOR(price)
+            if price < 0:
+                raise ValidationError("Ensure this value is greater than or equal to 0.")
+        except InvalidOperation:
+            errors["price"] = ["A valid number is required."]
+        except ValidationError as exc:
+            errors["price"] = exc.messages
+    for field in ("stock", "stock_delta"):
+        if entry.get(field) is not None:
+            value = _parse_int(entry[field])
+            if value is None:
+                errors[field] = ["A valid integer is required."]
+            elif field == "stock":
+                stock = value
+            else:
+                delta = value
+    if stock is not None and stock < 0:
+        errors["stock"] = ["Ensure this value is greater than or equal to 0."]
+    elif stock is not None and stock > MAX_STOCK:
+        errors["stock"] = [f"Ensure this value is less than or equal to {MAX_STOCK}."]
+    if price is None and stock is None and delta is None and not errors:
+        errors["non_field_errors"] = ["Nothing to update: give price, stock or stock_delta."]
+    if errors:
+        raise ValueError(errors)
+    return pk, sku, price, stock, delta
+
+
+def apply_price_stock_updates(entries, chunk_size=1000):
+    """
+    Apply [{id|sku, price?, stock?, stock_delta?}, ...] in one transaction,
+    locking and reading each chunk of products with one query and writing
+    it with one executemany UPDATE. Invalid or unresolvable entries are
+    reported and skipped; entries hitting the same product apply in order.
+    Returns (results, updated_ids).
+    """
+    results = [None] * len(entries)
+    parsed = []
+    for index, entry in enumerate(entries):
+        try:
+            parsed.append((index, *_parse_update(entry)))
+        except ValueError as exc:
+            results[index] = {"index": index, "status": "error", "errors": exc.args[0]}
+
+    updated_ids = set()
+    now = timezone.now()
+    with transaction.atomic():
+        for start in range(0, len(parsed), chunk_size):
+            chunk = parsed[start:start + chunk_size]
+            ids = {pk for _, pk, _, _, _, _ in chunk if pk is not None}
+            skus = {sku for _, pk, sku, _, _, _ in chunk if pk is None}
+            rows = (
+                Product.objects.select_for_update()
+                .filter(Q(pk__in=ids) | Q(sku__in=skus))
+                .values_list("id", "sku", "price", "stock")
+            )
+            current, by_sku = {}, {}
+            for pk, sku, price, stock in rows:
+                current[pk] = [price, stock]
+                by_sku.setdefault(sku, []).append(pk)
+
+            touched = set()
+            for index, pk, sku, price, stock, delta in chunk:
+                if pk is None:
+                    matches = by_sku.get(sku, [])
+                    if len(matches) > 1:
+                        results[index] = {"index": index, "status": "error",
+                                          "errors": {"sku": ["Matches more than one product."]}}
+                        continue
+                    pk = matches[0] if matches else None
+                state = current.get(pk)
+                if state is None:
+                    results[index] = {"index": index, "status": "error", "errors": {"id": ["Product not found."]}}
+                    continue
+                new_stock = stock if stock is not None else state[1] + (delta or 0)
+                if new_stock < 0:
+                    results[index] = {"index": index, "id": pk, "status": "error",
+                                      "errors": {"stock_delta": [f"Only {state[1]} in stock."]}}
+                    continue
+                if new_stock > MAX_STOCK:
+                    results[index] = {"index": index, "id": pk, "status": "error",
+                                      "errors": {"stock_delta": [f"Stock cannot exceed {MAX_STOCK}."]}}
+                    continue
+                if price is not None:
+                    state[0] = price
+                state[1] = new_stock
+                touched.add(pk)
+                results[index] = {"index": index, "id": pk, "status": "updated",
+                                  "price": f"{state[0]:.2f}", "stock": new_stock}
+
+            db_now = connection.ops.adapt_datetimefield_value(now)
+            update_rows(Product, ["price", "stock", "updated_at"],
+                        [(db_price(current[pk][0]), current[pk][1], db_now, pk) for pk in touched])
+            updated_ids |= touched
+    return results, updated_ids
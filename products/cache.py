@@ -0,0 +1,138 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from .singleflight import FAILED, CacheLock, SingleFlight, wait_for
+
+CACHED_HEADERS = ("ETag", "Last-Modified")
+
+_flights = SingleFlight()
+
+
+def _version_key(name):
+    return f"products:version:{name}"
+
+
+def get_version(name):
+    """
+    Shared version counter for a derived catalog structure. Processes
+    keep their own copy of the structure and rebuild when this moves.
+    """
+    version = cache.get(_version_key(name))
+    if version is None:
+        cache.add(_version_key(name), time.time_ns(), None)
+        version = cache.get(_version_key(name))
+    return version
+
+
+def bump_version(name):
+    try:
+        cache.incr(_version_key(name))
+    except ValueError:
+        # evicted: restart from a value no process can still be holding
+        cache.set(_version_key(name), time.time_ns(), None)
+
+
+def _response_key(request):
+    params = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+    raw = f"{request.get_host()}|{request.path}|{params}|{request.accepted_renderer.format}"
+    return f"products:response:{hashlib.md5(raw.encode()).hexdigest()}"
+
+
+def _from_entry(request, entry):
+    headers = entry["headers"]
+    last_modified = parse_http_date_safe(headers.get("Last-Modified", ""))
+    response = get_conditional_response(request, etag=headers.get("ETag"), last_modified=last_modified)
+    if response is None:
+        response = Response(entry["data"])
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+def _current(key, version):
+    entry = cache.get(key)
+    return entry if entry is not None and entry["version"] == version else None
+
+
+def _store(key, version, response):
+    if response.status_code != 200 or not isinstance(response, Response):
+        return None
+    headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+    entry = {"version": version, "data": response.data, "headers": headers}
+    cache.set(key, entry, settings.CATALOG_CACHE_TIMEOUT)
+    return entry
+
+
+def cached_response(handler):
+    """
+    Cache anonymous list/retrieve responses keyed on path plus normalized
+    query params. Entries carry the catalog version they were built
+    under; products.signals bumps it on any catalog write, which retires
+    every entry at once without enumerating keys.
+
+    Misses are single-flight (CATALOG_SINGLE_FLIGHT): one request per key
+    and version runs the handler while concurrent ones wait for its entry.
+    "process" coalesces threads of this process; "cache" also takes a lock
+    in the shared cache so one process rebuilds while the others poll for
+    the result. With CATALOG_STALE_WHILE_REVALIDATE, requests that find
+    a rebuild already running get the previous entry instead of waiting.
+    """
+
+    @wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(self, request, *args, **kwargs)
+
+        key = _response_key(request)
+        version = get_version("catalog")
+        entry = cache.get(key)
+        if entry is not None and entry["version"] == version:
+            return _from_entry(request, entry)
+
+        def render():
+            response = handler(self, request, *args, **kwargs)
+            return response, _store(key, version, response)
+
+        mode = settings.CATALOG_SINGLE_FLIGHT
+        if not mode:
+            return render()[0]
+
+        timeout = settings.CATALOG_SINGLE_FLIGHT_TIMEOUT
+        stale = entry if settings.CATALOG_STALE_WHILE_REVALIDATE else None
+        flight = f"{key}:{version}"
+        if stale is not None and _flights.in_flight(flight):
+            return _from_entry(request, stale)
+
+        def revalidate():
+            if mode != "cache":
+                return render()
+            lock = CacheLock(flight, timeout)
+            if lock.acquire():
+                try:
+                    return render()
+                finally:
+                    lock.release()
+            # another process is rebuilding this entry
+            if stale is not None:
+                return None, stale
+            fresh = wait_for(lambda: _current(key, version), timeout)
+            return (None, fresh) if fresh is not None else render()
+
+        result, shared = _flights.run(flight, revalidate, wait=timeout)
+        if result is not FAILED:
+            response, entry = result
+            if response is not None and not shared:
+                return response
+            if entry is not None:
+                return _from_entry(request, entry)
+        # the rebuild failed, timed out or was not cacheable
+        return handler(self, request, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,79 @@
+import hashlib
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+from .cache import get_version
+
+
+def conditional_get(get_validators):
+    """
+    Wrap a list/retrieve handler with ETag and Last-Modified support.
+    get_validators(view, request, *args, **kwargs) returns a
+    (version, last_modified) pair from a cheap query, so a matching
+    If-None-Match / If-Modified-Since gets its 304 before anything is
+    fetched or serialized.
+    """
+
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            version, last_modified = get_validators(self, request, *args, **kwargs)
+            if version is None:
+                return handler(self, request, *args, **kwargs)
+
+            # the body also varies with host (absolute media URLs), query and format
+            variant = f"{version}|{request.get_host()}|{request.get_full_path()}|{request.accepted_renderer.format}"
+            etag = quote_etag(hashlib.md5(variant.encode()).hexdigest())
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = handler(self, request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response["ETag"] = etag
+                if timestamp is not None:
+                    response["Last-Modified"] = http_date(timestamp)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _catalog_queryset(view):
+    # filters only: no prefetches or ordering for a version probe
+    return view.filter_queryset(view.get_queryset()).prefetch_related(None).order_by()
+
+
+def product_detail_validators(view, request, *args, **kwargs):
+    lookup = {view.lookup_field: kwargs[view.lookup_url_kwarg or view.lookup_field]}
+    try:
+        updated_at = _catalog_queryset(view).filter(**lookup).values_list("updated_at", flat=True).first()
+    except (TypeError, ValueError, ValidationError):
+        updated_at = None
+    if updated_at is None:
+        return None, None
+    return updated_at.isoformat(), updated_at
+
+
+def product_list_validators(view, request, *args, **kwargs):
+    """
+    max(updated_at) plus count over the filtered listing, as an ETag
+    only: deactivating or deleting any product but the newest leaves
+    max(updated_at) alone, so it cannot serve as a Last-Modified.
+    """
+    ids = view.snapshot_ids()
+    if ids is not None:
+        # answered from memory: tag with the live catalog version, which every write moves
+        return f"{get_version('catalog')}:{view._snapshot.version}:{len(ids)}", None
+    stats = _catalog_queryset(view).aggregate(last=Max("updated_at"), count=Count("pk"))
+    return f"{stats['last']}:{stats['count']}", None
+
+
+def category_validators(view, request, *args, **kwargs):
+    # Category has no timestamp; the version moves on every save/delete
+    return str(get_version("categories")), None
@@ -0,0 +1,135 @@
+import hashlib
+import re
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import get_version
+from .models import ProductAttribute
+
+ATTR_PARAM_RE = re.compile(r"^attr\[(?P<key>[^\]]+)\]$")
+
+
+def to_bitmap(ids):
+    """Set of product ids as a Python int with bit `id` set."""
+    ids = list(ids)
+    if not ids:
+        return 0
+    buf = bytearray(max(ids) // 8 + 1)
+    for pk in ids:
+        buf[pk >> 3] |= 1 << (pk & 7)
+    return int.from_bytes(buf, "little")
+
+
+class FacetIndex:
+    """
+    Active products' ProductAttribute (key, value) pairs as per-value
+    product-id bitmaps, so a facet count is an AND plus bit_count()
+    rather than a GROUP BY.
+    """
+
+    def __init__(self, rows):
+        ids = {}
+        for product_id, key, value in rows:
+            ids.setdefault(key, {}).setdefault(value, []).append(product_id)
+        self.bitmaps = {
+            key: {value: to_bitmap(pks) for value, pks in values.items()}
+            for key, values in ids.items()
+        }
+
+    @classmethod
+    def build(cls):
+        rows = ProductAttribute.objects.filter(product__is_active=True).values_list("product_id", "key", "value")
+        return cls(rows.iterator(chunk_size=5000))
+
+    def matching(self, filters):
+        """
+        Bitmap of the active products matching attribute filters (every
+        active product with attributes when there are none), the same set
+        filter_by_attributes selects, without a query.
+        """
+        result = None
+        for key, values in filters.items():
+            bitmaps = self.bitmaps.get(key, {})
+            matched = 0
+            for value in values:
+                matched |= bitmaps.get(value, 0)
+            result = matched if result is None else result & matched
+        if result is None:
+            # products without attributes add nothing to any count
+            result = 0
+            for values in self.bitmaps.values():
+                for bitmap in values.values():
+                    result |= bitmap
+        return result
+
+    def counts(self, result_bitmap):
+        facets = {}
+        for key, values in self.bitmaps.items():
+            counts = {}
+            for value, bitmap in values.items():
+                count = (bitmap & result_bitmap).bit_count()
+                if count:
+                    counts[value] = count
+            if counts:
+                facets[key] = dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+        return facets
+
+
+_lock = threading.Lock()
+_index = None
+_index_version = None
+
+
+def get_facet_index():
+    global _index, _index_version
+    version = get_version("facets")
+    if _index is None or _index_version != version:
+        with _lock:
+            if _index is None or _index_version != version:
+                _index = FacetIndex.build()
+                _index_version = version
+    return _index
+
+
+def attribute_filters(query_params):
+    """{key: [values]} from ?attr[color]=brown&attr[color]=black&attr[material]=teak"""
+    filters = {}
+    for param in query_params:
+        match = ATTR_PARAM_RE.match(param)
+        if match:
+            values = [v for v in query_params.getlist(param) if v]
+            if values:
+                filters[match.group("key")] = values
+    return filters
+
+
+def filter_by_attributes(queryset, filters):
+    # values within a key are OR-ed, keys are AND-ed
+    for key, values in filters.items():
+        queryset = queryset.filter(
+            pk__in=ProductAttribute.objects.filter(key=key, value__in=values).values("product_id")
+        )
+    return queryset
+
+
+def facet_counts(queryset):
+    """Per-key value counts over the products in queryset."""
+    ids = queryset.prefetch_related(None).order_by().values_list("pk", flat=True)
+    return get_facet_index().counts(to_bitmap(ids))
+
+
+def cached_facet_counts(queryset, filters):
+    """
+    facet_counts(queryset) cached under the filters that produced
+    queryset, so paging through one result set counts it once. Catalog
+    and attribute writes move the versions in the key.
+    """
+    raw = f"{sorted(filters.items())}|{get_version('catalog')}|{get_version('facets')}"
+    key = f"products:facets:{hashlib.md5(raw.encode()).hexdigest()}"
+    counts = cache.get(key)
+    if counts is None:
+        counts = facet_counts(queryset)
+        cache.set(key, counts, settings.CATALOG_CACHE_TIMEOUT)
+    return counts
@@ -0,0 +1,173 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+
+# name -> bounding box; each size is written as JPEG and as WebP
+VARIANT_SIZES = {
+    "thumbnail": (200, 200),
+    "small": (400, 400),
+    "medium": (800, 800),
+}
+FORMATS = {"jpeg": ("JPEG", "jpg"), "webp": ("WEBP", "webp")}
+QUALITY = 82
+
+
+def variant_name(source, size, ext, content):
+    """
+    variants/<name>_<size>.<hash>.<ext>: the content hash makes every
+    name immutable (see MEDIA_IMMUTABLE_PATTERN), so a re-render with
+    different bytes gets a new URL.
+    """
+    stem, _ = os.path.splitext(source)
+    directory, filename = os.path.split(stem)
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    return os.path.join(directory, "variants", f"{filename}_{size}.{digest}.{ext}")
+
+
+def render_variants(source):
+    """
+    Resize one stored original into every size/format. Runs in a worker
+    process: storage I/O and Pillow only, no database access.
+    Returns the ProductImage.variants mapping.
+    """
+    from PIL import Image, ImageOps
+
+    with default_storage.open(source, "rb") as fh:
+        with Image.open(fh) as original:
+            original = ImageOps.exif_transpose(original)
+            original.load()
+
+    variants = {"source": source}
+    for size, box in VARIANT_SIZES.items():
+        image = original.copy()
+        image.thumbnail(box, Image.Resampling.LANCZOS)
+        for key, (fmt, ext) in FORMATS.items():
+            frame = image.convert("RGB") if fmt == "JPEG" and image.mode not in ("RGB", "L") else image
+            buf = BytesIO()
+            frame.save(buf, fmt, quality=QUALITY, optimize=True)
+            content = buf.getvalue()
+            name = variant_name(source, size, ext, content)
+            # same name, same bytes
+            if not default_storage.exists(name):
+                name = default_storage.save(name, ContentFile(content))
+            variants[f"{size}_{key}" if key != "jpeg" else size] = {
+                "name": name, "width": image.width, "height": image.height,
+            }
+    return variants
+
+
+def _init_worker():
+    import django
+
+    django.setup()
+
+
+_lock = threading.Lock()
+_pool = None
+
+
+def get_pool(workers=None):
+    """
+    Process pool shared by uploads in this process. spawn rather than
+    fork: forking a threaded server process copies its locks and sockets.
+    """
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=workers or settings.PRODUCT_IMAGE_WORKERS or None,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _pool
+
+
+def store_variants(image_id, variants):
+    """
+    Put variants on the ProductImage unless its image was replaced while
+    they rendered, then delete files of the variants they supersede.
+    Returns the image's product id, or None when nothing was stored.
+    """
+    from .models import ProductImage
+
+    rows = ProductImage.objects.filter(pk=image_id, image=variants["source"])
+    current = rows.values_list("product_id", "variants").first()
+    if current is None or not rows.update(variants=variants):
+        return None
+    product_id, previous = current
+    keep = {value["name"] for key, value in variants.items() if key != "source"}
+    delete_variants({key: value for key, value in (previous or {}).items()
+                     if key == "source" or value["name"] not in keep})
+    return product_id
+
+
+def save_variants(image_id, variants):
+    from .signals import catalog_changed, touch_products
+
+    product_id = store_variants(image_id, variants)
+    if product_id is not None:
+        touch_products([product_id])
+        catalog_changed()
+
+
+def _on_done(image_id):
+    def callback(future):
+        try:
+            variants = future.result()
+        except Exception:
+            # unreadable upload; the image keeps serving its original only
+            return
+        try:
+            save_variants(image_id, variants)
+        finally:
+            close_old_connections()
+
+    return callback
+
+
+def schedule_variants(image):
+    """
+    Queue derivative generation for a saved ProductImage without blocking
+    the request. PRODUCT_IMAGE_VARIANTS_SYNC renders inline instead.
+    """
+    if not image.image:
+        return
+    source = image.image.name
+    if settings.PRODUCT_IMAGE_VARIANTS_SYNC:
+        try:
+            variants = render_variants(source)
+        except Exception:
+            return
+        save_variants(image.pk, variants)
+        return
+    get_pool().submit(render_variants, source).add_done_callback(_on_done(image.pk))
+
+
+def delete_variants(variants):
+    """Remove the files of a ProductImage.variants mapping from storage."""
+    for key, value in (variants or {}).items():
+        if key != "source":
+            default_storage.delete(value["name"])
+
+
+def variant_urls(variants, request=None):
+    """ProductImage.variants as {variant: {url, width, height}} for API output."""
+    result = {}
+    for key, value in (variants or {}).items():
+        if key == "source":
+            continue
+        url = default_storage.url(value["name"])
+        result[key] = {
+            "url": request.build_absolute_uri(url) if request is not None else url,
+            "width": value["width"],
+            "height": value["height"],
+        }
+    return result
@@ -0,0 +1,142 @@
+import json
+
+from django.conf import settings
+from django.db import connection, transaction
+from rest_framework.utils.encoders import JSONEncoder
+
+from .bulk import db_price, delete_rows, insert_rows
+from .compiled import CompiledSerializer
+from .models import Product, ProductListing, StaleProductListing
+from .serializers import ProductSerializer
+
+CHUNK_SIZE = 500
+COLUMNS = ["product_id", "price", "created_at", "payload"]
+
+
+def render_payloads(products):
+    """
+    {product id: ProductSerializer JSON}. Rendered without a request, so
+    media URLs stay relative; listing_data makes them absolute per request.
+    """
+    return {
+        item["id"]: json.dumps(item, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":"))
+        for item in CompiledSerializer(ProductSerializer).many(products)
+    }
+
+
+def _rows(products):
+    payloads = render_payloads(products)
+    adapt = connection.ops.adapt_datetimefield_value
+    return [(p.pk, db_price(p.price), adapt(p.created_at), payloads[p.pk]) for p in products]
+
+
+def refresh_listings(product_ids, chunk_size=CHUNK_SIZE):
+    """
+    Re-render the listing rows for product_ids. Deleted and inactive
+    products lose their row.
+    """
+    ids = sorted(set(product_ids))
+    for i in range(0, len(ids), chunk_size):
+        chunk = ids[i:i + chunk_size]
+        products = list(Product.objects.for_catalog().filter(pk__in=chunk))
+        rows = _rows(products)
+        with transaction.atomic():
+            delete_rows(ProductListing, "product_id", chunk)
+            insert_rows(ProductListing, COLUMNS, rows)
+
+
+def refresh_on_commit(product_ids):
+    # with the read model off there is nothing to keep current; turning it
+    # on requires rebuild_product_listings anyway
+    if not settings.PRODUCT_LISTING_READ_MODEL:
+        return
+    ids = list(product_ids)
+    if ids:
+        transaction.on_commit(lambda: refresh_listings(ids))
+
+
+def mark_stale(product_ids):
+    """
+    Queue listings for re-rendering by refresh_stale_listings instead of
+    rendering them now: for bulk writes, where rendering would dominate.
+    """
+    if not settings.PRODUCT_LISTING_READ_MODEL:
+        return
+    StaleProductListing.objects.bulk_create(
+        [StaleProductListing(product_id=pk) for pk in set(product_ids)], batch_size=1000, ignore_conflicts=True
+    )
+
+
+def refresh_stale_listings(chunk_size=CHUNK_SIZE):
+    """Re-render queued listings; returns how many were refreshed."""
+    count = 0
+    while True:
+        ids = list(StaleProductListing.objects.order_by("pk").values_list("pk", flat=True)[:chunk_size])
+        if not ids:
+            return count
+        # dequeue and refresh together: a failed refresh leaves them queued
+        with transaction.atomic():
+            delete_rows(StaleProductListing, "product_id", ids)
+            refresh_listings(ids, chunk_size)
+        count += len(ids)
+
+
+def rebuild_listings(chunk_size=CHUNK_SIZE):
+    """Replace the whole read model; returns the number of rows written."""
+    ids = list(Product.objects.active().order_by("pk").values_list("pk", flat=True))
+    with transaction.atomic():
+        ProductListing.objects.all().delete()
+        StaleProductListing.objects.all().delete()
+        for i in range(0, len(ids), chunk_size):
+            products = list(Product.objects.for_catalog().filter(pk__in=ids[i:i + chunk_size]))
+            insert_rows(ProductListing, COLUMNS, _rows(products))
+    return len(ids)
+
+
+def check_listings(chunk_size=CHUNK_SIZE):
+    """
+    Compare the read model with freshly rendered payloads. Yields
+    (product_id, problem), problem being "missing", "stale" or "orphaned".
+    """
+    ids = list(Product.objects.active().order_by("pk").values_list("pk", flat=True))
+    for i in range(0, len(ids), chunk_size):
+        chunk = ids[i:i + chunk_size]
+        fresh = render_payloads(Product.objects.for_catalog().filter(pk__in=chunk))
+        stored = dict(ProductListing.objects.filter(product_id__in=chunk).values_list("product_id", "payload"))
+        for pk in chunk:
+            if pk not in stored:
+                yield pk, "missing"
+            elif stored[pk] != fresh.get(pk):
+                yield pk, "stale"
+    orphaned = ProductListing.objects.exclude(product__in=Product.objects.active()).order_by("pk")
+    for pk in orphaned.values_list("pk", flat=True):
+        yield pk, "orphaned"
+
+
+def _absolute(url, request):
+    return request.build_absolute_uri(url) if url else url
+
+
+def listing_data(listings, request=None):
+    """
+    Payloads of listings, with media URLs made absolute as the serializer
+    would. Listings still queued as stale are rendered live.
+    """
+    listings = list(listings)
+    stale = StaleProductListing.objects.filter(product_id__in=[listing.product_id for listing in listings])
+    stale = set(stale.values_list("product_id", flat=True))
+    payloads = {listing.product_id: listing.payload for listing in listings}
+    if stale:
+        fresh = render_payloads(Product.objects.for_catalog().filter(pk__in=stale))
+        payloads = {pk: fresh.get(pk) if pk in stale else payload for pk, payload in payloads.items()}
+    # a stale product that has since been deactivated drops out
+    items = [json.loads(payload) for payload in payloads.values() if payload is not None]
+    if request is not None:
+        for item in items:
+            for image in item["images"]:
+                image["image"] = _absolute(image["image"], request)
+                for variant in image["variants"].values():
+                    variant["url"] = _absolute(variant["url"], request)
+            for variant in item["primary_image_variants"].values():
+                variant["url"] = _absolute(variant["url"], request)
+    return items
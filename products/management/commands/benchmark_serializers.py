@@ -0,0 +1,95 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from cart.models import CartItem
+from cart.serializers import CartItemSerializer
+from products.bulk import db_price, insert_rows
+from products.compiled import CompiledSerializer
+from products.models import Category, Product, ProductImage
+from products.serializers import ProductSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time ProductSerializer/CartItemSerializer against their compiled read-only "
+        "versions on generated rows. Everything is created inside a transaction "
+        "that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+        parser.add_argument("--repeat", type=int, default=3, help="best of N runs")
+
+    def handle(self, *args, **options):
+        self.repeat = options["repeat"]
+        self.request = RequestFactory().get("/products/products/", HTTP_HOST="localhost")
+        try:
+            with transaction.atomic():
+                self.fixtures(max(options["sizes"]))
+                for size in options["sizes"]:
+                    self.run(size)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def fixtures(self, size):
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        insert_rows(Product, ["name", "slug", "sku", "description", "price", "stock", "is_active",
+                              "created_at", "updated_at"],
+                    [(f"Bench product {i}", f"bench-product-{i}", f"BENCH-{i}", "Solid oak.",
+                      db_price(i % 500 + 0.99), i % 40, True, now, now) for i in range(size)])
+        self.product_ids = list(
+            Product.objects.filter(sku__startswith="BENCH-").order_by("pk").values_list("pk", flat=True)
+        )
+        categories = [Category.objects.create(name=f"Bench category {i}") for i in range(2)]
+        insert_rows(Product.categories.through, ["product_id", "category_id"],
+                    [(pk, c.pk) for pk in self.product_ids for c in categories])
+        insert_rows(ProductImage, ["product_id", "image", "alt_text", "variants"],
+                    [(pk, f"product_images/bench-{pk}.jpg", "", "{}") for pk in self.product_ids])
+        self.user = get_user_model().objects.create(username="serializer-benchmark")
+        insert_rows(CartItem, ["user_id", "product_id", "quantity"],
+                    [(self.user.pk, pk, 1 + pk % 3) for pk in self.product_ids])
+
+    def run(self, size):
+        products = list(Product.objects.for_catalog().filter(pk__in=self.product_ids[:size]))
+        context = {"request": self.request}
+        self.compare(
+            f"ProductSerializer x{size}",
+            lambda: ProductSerializer(products, many=True, context=context).data,
+            lambda: CompiledSerializer(ProductSerializer, context).many(products),
+        )
+        items = list(CartItem.objects.filter(user=self.user).select_related("product")[:size])
+        self.compare(
+            f"CartItemSerializer x{size}",
+            lambda: CartItemSerializer(items, many=True).data,
+            lambda: CompiledSerializer(CartItemSerializer).many(items),
+        )
+
+    def best(self, func):
+        timings = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - started)
+        return min(timings), result
+
+    def compare(self, label, drf, compiled):
+        drf_time, expected = self.best(drf)
+        compiled_time, actual = self.best(compiled)
+        if json.dumps(expected, cls=JSONEncoder) != json.dumps(actual, cls=JSONEncoder):
+            raise CommandError(f"{label}: compiled output differs from the serializer")
+        self.stdout.write(
+            f"{label:<28} DRF {drf_time * 1000:8.1f} ms   compiled {compiled_time * 1000:8.1f} ms   "
+            f"{drf_time / compiled_time:5.1f}x"
+        )
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.listing import CHUNK_SIZE, check_listings, refresh_listings
+from products.signals import catalog_changed
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare every ProductListing row with a freshly rendered payload and "
+        "report missing, stale and orphaned rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=CHUNK_SIZE)
+        parser.add_argument("--fix", action="store_true", help="re-render the rows that differ")
+
+    def handle(self, *args, **options):
+        problems = list(check_listings(chunk_size=options["batch_size"]))
+        for pk, problem in problems:
+            self.stdout.write(f"product {pk}: {problem}")
+        if not problems:
+            self.stdout.write(self.style.SUCCESS("Product listings are consistent."))
+            return
+        if options["fix"]:
+            refresh_listings([pk for pk, _ in problems])
+            catalog_changed()
+            self.stdout.write(self.style.SUCCESS(f"Fixed {len(problems)} product listings."))
+            return
+        raise CommandError(f"{len(problems)} product listings are inconsistent; rerun with --fix.")
@@ -0,0 +1,69 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from products.cache import bump_version
+from products.imaging import _init_worker, render_variants, store_variants
+from products.models import ProductImage
+from products.signals import touch_products
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnail/WebP derivatives for product images, resizing in parallel worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=None, help="default: one per CPU")
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--force", action="store_true", help="regenerate images that already have variants")
+
+    def handle(self, *args, **options):
+        images = ProductImage.objects.exclude(image="").order_by("id")
+        pending = [
+            (pk, name) for pk, name, variants in images.values_list("id", "image", "variants").iterator()
+            if options["force"] or (variants or {}).get("source") != name
+        ]
+        if not pending:
+            self.stdout.write("All product images are up to date.")
+            return
+
+        done = failed = 0
+        started = time.perf_counter()
+        batch_size = options["batch_size"]
+        with ProcessPoolExecutor(
+            max_workers=options["workers"],
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        ) as pool:
+            for i in range(0, len(pending), batch_size):
+                chunk = pending[i:i + batch_size]
+                futures = {pool.submit(render_variants, name): (pk, name) for pk, name in chunk}
+                results = []
+                for future in as_completed(futures):
+                    pk, name = futures[future]
+                    try:
+                        results.append((pk, future.result()))
+                    except Exception as exc:
+                        failed += 1
+                        self.stderr.write(f"image {pk} ({name}): {exc}")
+                done += self.save(results)
+                self.stdout.write(f"{done + failed}/{len(pending)} images", ending="\r")
+
+        bump_version("catalog")
+        elapsed = time.perf_counter() - started
+        self.stdout.write("")
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated variants for {done} images ({failed} failed) in {elapsed:.1f}s"
+        ))
+
+    def save(self, results):
+        saved, product_ids = 0, set()
+        for pk, variants in results:
+            # skips images replaced while they were being resized
+            product_id = store_variants(pk, variants)
+            if product_id is not None:
+                saved += 1
+                product_ids.add(product_id)
+        touch_products(product_ids)
+        return saved
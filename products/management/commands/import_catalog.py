@@ -0,0 +1,224 @@
+import csv
+import io
+import json
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from products.bulk import MAX_STOCK, PRICE_VALIDATOR, db_price, delete_rows, insert_rows, update_rows
+from products.cache import bump_version
+from products.listing import mark_stale
+from products.models import Category, Product, ProductAttribute
+from products.search import get_search_backend
+from products.signals import catalog_changed
+from products.slugs import assign_slugs
+
+TRUE_VALUES = {"1", "true", "yes", "y", "t"}
+UPDATE_FIELDS = ["name", "description", "price", "stock", "is_active", "updated_at"]
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_csv(stream):
+    """
+    CSV with a header row. categories is "|"-separated slugs or names;
+    columns named attr:<key> become ProductAttribute rows.
+    """
+    for row in csv.DictReader(stream):
+        row["attributes"] = {
+            column[5:]: value for column, value in row.items() if column.startswith("attr:") and value
+        }
+        row["categories"] = [c for c in (row.get("categories") or "").split("|") if c]
+        yield row
+
+
+def read_jsonl(stream):
+    """
+    One object per line; categories is a list, or "|"-separated like CSV.
+    A line that is not a JSON object comes through as a RowError, so it
+    is skipped like any other bad row.
+    """
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield RowError(f"line {number}: invalid JSON ({exc})")
+            continue
+        if not isinstance(row, dict):
+            yield RowError(f"line {number}: expected an object")
+            continue
+        if isinstance(row.get("categories"), str):
+            row["categories"] = [c for c in row["categories"].split("|") if c]
+        yield row
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl}
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a supplier catalog (CSV or JSONL) into Product, upserting on sku "
+        "in batched multi-row inserts and updates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV/JSONL file, or - for stdin")
+        parser.add_argument("--format", choices=sorted(READERS), help="default: from the file extension")
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--create-categories", action="store_true", help="create unknown categories by name")
+
+    def handle(self, *args, **options):
+        fmt = options["format"] or ("csv" if options["path"].endswith(".csv") else "jsonl")
+        self.batch_size = options["batch_size"]
+        self.create_categories = options["create_categories"]
+        self.categories = {}
+        for pk, slug, name in Category.objects.values_list("id", "slug", "name"):
+            self.categories[slug] = pk
+            self.categories.setdefault(name.lower(), pk)
+        self.search = get_search_backend()
+
+        if options["path"] == "-":
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+        else:
+            try:
+                stream = open(options["path"], encoding="utf-8", newline="")
+            except OSError as exc:
+                raise CommandError(exc)
+
+        created = updated = errors = 0
+        started = time.perf_counter()
+        with stream:
+            rows = READERS[fmt](stream)
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                c, u, e = self.import_batch(batch)
+                created, updated, errors = created + c, updated + u, errors + e
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{created + updated + errors} rows, {(created + updated) / elapsed:,.0f} products/s", ending="\r"
+                )
+
+        bump_version("facets")
+        catalog_changed()
+        elapsed = time.perf_counter() - started
+        self.stdout.write("")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {created + updated} products ({created} created, {updated} updated, {errors} skipped) "
+            f"in {elapsed:.1f}s: {(created + updated) / max(elapsed, 1e-9):,.0f} products/s"
+        ))
+
+    def parse(self, row):
+        try:
+            name = (row.get("name") or "").strip()
+            if not name:
+                raise RowError("missing name")
+            price = Decimal(str(row["price"]))
+            PRICE_VALIDATOR(price)
+            stock = int(row.get("stock") or 0)
+            if stock < 0:
+                raise RowError("negative stock")
+            if stock > MAX_STOCK:
+                raise RowError(f"stock above {MAX_STOCK}")
+        except ValidationError as exc:
+            raise RowError("; ".join(exc.messages))
+        except (KeyError, TypeError, ValueError, InvalidOperation) as exc:
+            raise RowError(str(exc) or "invalid row")
+        is_active = row.get("is_active", True)
+        if isinstance(is_active, str):
+            is_active = is_active.strip().lower() in TRUE_VALUES
+        # JSONL skus may be numbers; store and match them as text
+        sku = row.get("sku")
+        return Product(
+            name=name,
+            sku=str(sku).strip() or None if sku is not None else None,
+            description=row.get("description") or "",
+            price=price,
+            stock=stock,
+            is_active=bool(is_active),
+        )
+
+    def category_ids(self, names):
+        ids = []
+        for name in names:
+            pk = self.categories.get(name) or self.categories.get(name.lower())
+            if pk is None and self.create_categories:
+                category = Category.objects.create(name=name)
+                pk = self.categories[category.slug] = self.categories[name.lower()] = category.pk
+            if pk is not None:
+                ids.append(pk)
+        return ids
+
+    def import_batch(self, rows):
+        products, extras, errors = {}, {}, 0
+        for row in rows:
+            if isinstance(row, RowError):
+                errors += 1
+                self.stderr.write(f"skipped {row}")
+                continue
+            try:
+                product = self.parse(row)
+            except RowError as exc:
+                errors += 1
+                self.stderr.write(f"skipped row {row.get('sku') or row.get('name')!r}: {exc}")
+                continue
+            # later rows for the same sku win; rows without one are always new
+            key = product.sku or object()
+            products[key] = product
+            extras[key] = (self.category_ids(row.get("categories") or []), row.get("attributes") or {})
+
+        with transaction.atomic():
+            skus = [k for k in products if isinstance(k, str)]
+            existing = dict(Product.objects.filter(sku__in=skus).values_list("sku", "id")) if skus else {}
+            new, changed = [], []
+            db_now = connection.ops.adapt_datetimefield_value(timezone.now())
+            for key, product in products.items():
+                if key in existing:
+                    product.pk = existing[key]
+                    changed.append(product)
+                else:
+                    new.append(product)
+
+            assign_slugs(new)
+            insert_rows(Product, ["name", "slug", "sku", "description", "price", "stock", "is_active",
+                                  "created_at", "updated_at"],
+                        [(p.name, p.slug, p.sku, p.description, db_price(p.price), p.stock, p.is_active,
+                          db_now, db_now) for p in new])
+            for i in range(0, len(new), 500):
+                chunk = new[i:i + 500]
+                ids = dict(Product.objects.filter(slug__in=[p.slug for p in chunk]).values_list("slug", "id"))
+                for product in chunk:
+                    product.pk = ids[product.slug]
+            update_rows(Product, UPDATE_FIELDS,
+                        [(p.name, p.description, db_price(p.price), p.stock, p.is_active, db_now, p.pk)
+                         for p in changed])
+
+            changed_ids = [p.pk for p in changed]
+            Through = Product.categories.through
+            delete_rows(Through, "product_id", changed_ids)
+            delete_rows(ProductAttribute, "product_id", changed_ids)
+            links, attributes = [], []
+            for key, product in products.items():
+                category_ids, attrs = extras[key]
+                links.extend((product.pk, pk) for pk in set(category_ids))
+                attributes.extend((product.pk, k, str(v)) for k, v in attrs.items())
+            insert_rows(Through, ["product_id", "category_id"], links)
+            insert_rows(ProductAttribute, ["product_id", "key", "value"], attributes)
+
+            if self.search is not None:
+                self.search.index_products(new + changed)
+            mark_stale([p.pk for p in new + changed])
+
+        return len(new), len(changed), errors
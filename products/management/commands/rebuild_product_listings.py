@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.listing import CHUNK_SIZE, rebuild_listings
+from products.signals import catalog_changed
+
+
+class Command(BaseCommand):
+    help = "Rebuild the ProductListing read model from the products tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = rebuild_listings(chunk_size=options["batch_size"])
+        catalog_changed()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {count} product listings in {time.perf_counter() - started:.1f}s."
+        ))
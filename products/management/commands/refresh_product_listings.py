@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.listing import CHUNK_SIZE, refresh_stale_listings
+from products.signals import catalog_changed
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-render the ProductListing rows queued as stale by bulk updates, imports "
+        "and checkouts. Run it periodically while PRODUCT_LISTING_READ_MODEL is on."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = refresh_stale_listings(chunk_size=options["batch_size"])
+        if count:
+            catalog_changed()
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {count} product listings in {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_productimage_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductListing',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing', serialize=False, to='products.product')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField()),
+                ('payload', models.TextField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['price', 'product'], name='products_pr_price_3f78b7_idx'), models.Index(fields=['created_at', 'product'], name='products_pr_created_eebe09_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_productlisting'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaleProductListing',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='products.product')),
+            ],
+        ),
+    ]
@@ -1,7 +1,8 @@
 from django.db import models
-from django.utils.text import slugify
 from django.conf import settings
 
+from .slugs import save_with_unique_slug
+
 User = settings.AUTH_USER_MODEL
 
 class Category(models.Model):
@@ -20,15 +21,8 @@ class Category(models.Model):
         return self.name
 
     def save(self, *args, **kwargs):
-        if not self.slug       :
-            # simple slug creation (ensure uniqueness in more robust way if needed)
-            base = slugify(self.name)
-            slug = base
-            i = 1
-            while Category.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-                slug = f"{base}-{i}"
-                i += 1
-            self.slug = slug
+        if not self.slug:
+            return save_with_unique_slug(self, super().save, *args, **kwargs)
         super().save(*args, **kwargs)
 
     def get_children(self):
@@ -38,6 +32,21 @@ class Category(models.Model):
         return Product.objects.filter(categories=self, is_active=True)
 
 
+class ProductQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(is_active=True)
+
+    def for_catalog(self):
+        return self.active().with_related()
+
+    def with_related(self):
+        # everything ProductSerializer touches, fetched in a fixed number of queries
+        return self.prefetch_related(
+            "categories",
+            models.Prefetch("images", queryset=ProductImage.objects.order_by("id")),
+        )
+
+
 class Product(models.Model):
     name = models.CharField(max_length=255)
     slug = models.SlugField(max_length=260, unique=True, blank=True)
@@ -51,23 +60,33 @@ class Product(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     stock = models.PositiveIntegerField(default=0)
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # keyset pagination over ?ordering=price / created_at
+            models.Index(fields=["price", "id"]),
+            models.Index(fields=["created_at", "id"]),
+        ]
+
     def __str__(self):
         return self.name
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            base = slugify(self.name)
-            slug = base
-            i = 1
-            while Product.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-                slug = f"{base}-{i}"
-                i += 1
-            self.slug = slug
+            return save_with_unique_slug(self, super().save, *args, **kwargs)
         super().save(*args, **kwargs)
 
+    @property
+    def primary_image_obj(self):
+        if "images" in getattr(self, "_prefetched_objects_cache", {}):
+            images = self.images.all()
+            return images[0] if images else None
+        return self.images.first()
+
     @property
     def primary_image(self):
-        img = self.images.first()
+        img = self.primary_image_obj
         return img.image.url if img and img.image else None
 
 
@@ -75,6 +94,8 @@ class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="images")
     image = models.ImageField(upload_to="product_images/")
     alt_text = models.CharField(max_length=255, blank=True)
+    # filled in the background by products.imaging: {"source": name, "thumbnail": {"name", "width", "height"}, ...}
+    variants = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return f"Image for {self.product.name}"
@@ -92,3 +113,55 @@ class ProductAttribute(models.Model):
 
     def __str__(self):
         return f"{self.key}: {self.value}"
+
+
+class ProductListing(models.Model):
+    """
+    Read model for the product list: one row per active product holding
+    its ProductSerializer output, rebuilt by products.listing whenever the
+    product or its images, categories or attributes change.
+    """
+
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name="listing")
+    # copies of the sortable columns, so ?ordering= scans this table alone
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField()
+    # JSON text rather than JSONField: MySQL's JSON type reorders object keys
+    payload = models.TextField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["price", "product"]),
+            models.Index(fields=["created_at", "product"]),
+        ]
+
+    def __str__(self):
+        return f"Listing for product {self.product_id}"
+
+
+class StaleProductListing(models.Model):
+    """
+    Products whose ProductListing row needs re-rendering after a bulk
+    write. Drained by refresh_product_listings; until then list pages
+    render these products' payloads live, though their place in price
+    order and the page count follow the stored row.
+    """
+
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name="+")
+
+    def __str__(self):
+        return f"Stale listing for product {self.product_id}"
+
+
+class ProductTombstone(models.Model):
+    """
+    A deleted product, recorded by products.signals so incremental
+    exports (?updated_since=) can tell consumers to drop it.
+    """
+
+    # a bare id: the product row is gone
+    product_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Deleted product {self.product_id}"
@@ -0,0 +1,190 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, FloatField, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework.filters import SearchFilter
+from rest_framework.settings import api_settings
+
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(term):
+    return TOKEN_RE.findall(term.lower())
+
+
+class BaseSearchBackend:
+    """
+    Full-text index over Product name, description and sku.
+    search() returns [(product_id, score), ...] best match first.
+    """
+
+    max_results = 1000
+
+    def search(self, term, limit):
+        raise NotImplementedError
+
+    def filter(self, queryset, term):
+        """
+        queryset narrowed to the products matching term and annotated with
+        search_score, higher being better. This default goes through
+        search(), so it keeps only the best PRODUCT_SEARCH_MAX_RESULTS
+        matches; the bundled backends match inside queryset's own SQL
+        and keep every one.
+        """
+        limit = getattr(settings, "PRODUCT_SEARCH_MAX_RESULTS", self.max_results)
+        scores = self.search(term, limit)
+        return queryset.filter(pk__in=[pk for pk, _score in scores]).annotate(
+            search_score=Case(
+                *[When(pk=pk, then=Value(float(score))) for pk, score in scores],
+                output_field=FloatField(),
+            )
+        )
+
+    def index_products(self, products):
+        pass
+
+    def remove_products(self, product_ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """FTS5 table kept in sync from products.signals (dev/test)."""
+
+    table = "products_product_fts"
+    # bm25 is lower-is-better; weight name over sku over description
+    score = f"bm25({table}, 10.0, 1.0, 5.0)"
+
+    def match_query(self, term):
+        # exact token matches score twice, so "oak" ranks above "oakland"
+        return " AND ".join(f'("{token}" OR "{token}"*)' for token in tokenize(term))
+
+    def search(self, term, limit):
+        query = self.match_query(term)
+        if not query:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, {self.score} AS score FROM {self.table} "
+                f"WHERE {self.table} MATCH %s ORDER BY score LIMIT %s",
+                [query, limit],
+            )
+            return [(pk, -score) for pk, score in cursor.fetchall()]
+
+    def filter(self, queryset, term):
+        # a join on the FTS table, so COUNT and every page see all matches
+        query = self.match_query(term)
+        if not query:
+            return super().filter(queryset, term)
+        qn = connection.ops.quote_name
+        product_id = f"{qn(queryset.model._meta.db_table)}.{qn(queryset.model._meta.pk.column)}"
+        return queryset.extra(
+            tables=[self.table],
+            where=[f"{self.table}.rowid = {product_id}", f"{self.table} MATCH %s"],
+            params=[query],
+        ).annotate(search_score=RawSQL(f"-{self.score}", [], output_field=FloatField()))
+
+    def index_products(self, products):
+        products = list(products)
+        if not products:
+            return
+        self.remove_products([p.pk for p in products])
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, name, description, sku) VALUES (%s, %s, %s, %s)",
+                [(p.pk, p.name, p.description, p.sku or "") for p in products],
+            )
+
+    def remove_products(self, product_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {self.table} WHERE rowid = %s", [(pk,) for pk in product_ids])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, name, description, sku) "
+                "SELECT id, name, description, COALESCE(sku, '') FROM products_product"
+            )
+
+
+class MySQLFulltextBackend(BaseSearchBackend):
+    """InnoDB FULLTEXT index on products_product; MySQL maintains it on write."""
+
+    # qualified, so joins to tables with a name column stay unambiguous
+    match = (
+        "MATCH (products_product.name, products_product.description, products_product.sku) "
+        "AGAINST (%s IN BOOLEAN MODE)"
+    )
+
+    def match_query(self, term):
+        return " ".join(f"+{token}*" for token in tokenize(term))
+
+    def search(self, term, limit):
+        query = self.match_query(term)
+        if not query:
+            return []
+        match = self.match
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id, {match} AS score FROM products_product WHERE {match} ORDER BY score DESC LIMIT %s",
+                [query, query, limit],
+            )
+            return list(cursor.fetchall())
+
+    def filter(self, queryset, term):
+        query = self.match_query(term)
+        if not query:
+            return super().filter(queryset, term)
+        return queryset.extra(where=[self.match], params=[query]).annotate(
+            search_score=RawSQL(self.match, [query], output_field=FloatField())
+        )
+
+
+VENDOR_BACKENDS = {
+    "sqlite": SQLiteFTSBackend,
+    "mysql": MySQLFulltextBackend,
+}
+
+_backend = None
+
+
+def get_search_backend():
+    """
+    The configured PRODUCT_SEARCH_BACKEND, else the one matching the
+    database vendor. None means no index: fall back to icontains search.
+    """
+    global _backend
+    if _backend is None:
+        path = getattr(settings, "PRODUCT_SEARCH_BACKEND", None)
+        backend_class = import_string(path) if path else VENDOR_BACKENDS.get(connection.vendor)
+        _backend = backend_class() if backend_class else False
+    return _backend or None
+
+
+class ProductSearchFilter(SearchFilter):
+    """
+    ?search= over the full-text index, ranked by search_score unless
+    ?ordering= is given. The match is part of the listing's own query,
+    so count and pagination cover every matching product.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        backend = get_search_backend()
+        if backend is None:
+            return super().filter_queryset(request, queryset, view)
+
+        term = " ".join(self.get_search_terms(request))
+        if not term:
+            return queryset
+
+        queryset = backend.filter(queryset, term)
+        if not request.query_params.get(api_settings.ORDERING_PARAM):
+            queryset = queryset.order_by("-search_score", "pk")
+        return queryset
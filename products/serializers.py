@@ -1,5 +1,7 @@
 from rest_framework import serializers
+from .imaging import variant_urls
 from .models import Category, Product, ProductImage, ProductAttribute
+from .tree import get_category_tree
 
 class CategorySerializer(serializers.ModelSerializer):
     children = serializers.SerializerMethodField()
@@ -9,29 +11,50 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ("id", "name", "slug", "description", "parent", "children", "image")
 
     def get_children(self, obj):
-        qs = obj.get_children()
-        return CategorySerializer(qs, many=True, context=self.context).data
+        # one cached tree per request instead of a query per node
+        tree = self.context.get("category_tree")
+        if tree is None:
+            tree = self.context["category_tree"] = get_category_tree()
+        return CategorySerializer(tree.children(obj.id), many=True, context=self.context).data
 
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    variants = serializers.SerializerMethodField()
+
     class Meta:
         model = ProductImage
-        fields = ("id", "image", "alt_text")
+        fields = ("id", "image", "alt_text", "variants")
+
+    def get_variants(self, obj):
+        return variant_urls(obj.variants, self.context.get("request"))
 
 
 class ProductSerializer(serializers.ModelSerializer):
     categories = serializers.PrimaryKeyRelatedField(queryset=Category.objects.filter(is_active=True), many=True)
     images = ProductImageSerializer(many=True, read_only=True)
     primary_image = serializers.SerializerMethodField()
+    primary_image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
-        fields = ("id", "name", "slug", "sku", "description", "price", "stock", "categories", "images", "primary_image", "is_active", "created_at", "updated_at")
+        fields = ("id", "name", "slug", "sku", "description", "price", "stock", "categories", "images", "primary_image", "primary_image_variants", "is_active", "created_at", "updated_at")
 
     def get_primary_image(self, obj):
         return obj.primary_image
 
+    def get_primary_image_variants(self, obj):
+        img = obj.primary_image_obj
+        return variant_urls(img.variants if img else None, self.context.get("request"))
+
 class ProductAttributeSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductAttribute
         fields = ["id", "key", "value"]
+
+
+class ProductExportSerializer(ProductSerializer):
+    """One line of the NDJSON catalog export."""
+    attributes = ProductAttributeSerializer(many=True, read_only=True)
+
+    class Meta(ProductSerializer.Meta):
+        fields = ProductSerializer.Meta.fields + ("attributes",)
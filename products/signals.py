@@ -0,0 +1,102 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import bump_version
+from .imaging import delete_variants, schedule_variants
+from .listing import refresh_on_commit
+from .models import Category, Product, ProductAttribute, ProductImage, ProductTombstone
+from .search import get_search_backend
+from .tree import invalidate_category_tree
+
+
+def touch_products(product_ids):
+    """
+    Bump updated_at on products whose payload changed through a related
+    row, so ETags and updated_at-based refreshes see the change.
+    """
+    product_ids = list(product_ids)
+    Product.objects.filter(pk__in=product_ids).update(updated_at=timezone.now())
+    refresh_on_commit(product_ids)
+
+
+def catalog_changed():
+    """Retire cached catalog responses; see products.cache.cached_response."""
+    bump_version("catalog")
+
+
+def categories_changed():
+    invalidate_category_tree()
+    bump_version("categories")
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=ProductImage)
+@receiver([post_save, post_delete], sender=ProductAttribute)
+@receiver(m2m_changed, sender=Product.categories.through)
+def catalog_row_changed(sender, **kwargs):
+    transaction.on_commit(catalog_changed)
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, **kwargs):
+    transaction.on_commit(categories_changed)
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    backend = get_search_backend()
+    if backend is not None:
+        backend.index_products([instance])
+    refresh_on_commit([instance.pk])
+    # the facet index only covers active products
+    transaction.on_commit(lambda: bump_version("facets"))
+
+
+@receiver(pre_delete, sender=Category)
+def category_deleting(sender, instance, **kwargs):
+    # the cascade drops category links without m2m_changed
+    refresh_on_commit(Product.objects.filter(categories=instance).values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    ProductTombstone.objects.create(product_id=instance.pk)
+    backend = get_search_backend()
+    if backend is not None:
+        backend.remove_products([instance.pk])
+
+
+@receiver(m2m_changed, sender=Product.categories.through)
+def product_categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse and action in ("post_add", "post_remove", "post_clear"):
+        touch_products([instance.pk])
+    elif reverse and action in ("post_add", "post_remove"):
+        touch_products(pk_set)
+    elif reverse and action == "pre_clear":
+        touch_products(instance.products.values_list("pk", flat=True))
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def image_changed(sender, instance, **kwargs):
+    touch_products([instance.product_id])
+
+
+@receiver(post_save, sender=ProductImage)
+def image_saved(sender, instance, **kwargs):
+    if instance.variants and instance.variants.get("source") != instance.image.name:
+        # the image was replaced: its variants are of the previous file
+        old = instance.variants
+        ProductImage.objects.filter(pk=instance.pk).update(variants={})
+        instance.variants = {}
+        transaction.on_commit(lambda: delete_variants(old))
+    if instance.image and instance.variants.get("source") != instance.image.name:
+        transaction.on_commit(lambda: schedule_variants(instance))
+
+
+@receiver([post_save, post_delete], sender=ProductAttribute)
+def attribute_changed(sender, instance, **kwargs):
+    touch_products([instance.product_id])
+    transaction.on_commit(lambda: bump_version("facets"))
@@ -0,0 +1,88 @@
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+
+FAILED = object()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = FAILED
+
+
+class SingleFlight:
+    """
+    Per-process duplicate suppression: while one thread runs func for a
+    key, other threads asking for the same key wait for that run and get
+    its result. If the run raises, or does not finish within wait
+    seconds, a waiter gets FAILED and should do the work itself.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def in_flight(self, key):
+        return key in self._calls
+
+    def run(self, key, func, wait=None):
+        """(result, shared): shared is False for the thread that ran func."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait(wait)
+            return call.result, True
+        try:
+            call.result = func()
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class CacheLock:
+    """
+    Mutex across processes on the shared cache: add() only succeeds for one
+    caller, and the timeout frees the lock if its holder dies. Needs a
+    cache shared by every process (memcached, Redis, database) to mean
+    anything beyond a single process.
+    """
+
+    def __init__(self, key, timeout):
+        self.key = f"{key}:lock"
+        self.timeout = timeout
+        self.token = None
+
+    def acquire(self):
+        token = uuid.uuid4().hex
+        if cache.add(self.key, token, self.timeout):
+            self.token = token
+            return True
+        return False
+
+    def held(self):
+        return cache.get(self.key) is not None
+
+    def release(self):
+        # best effort: don't delete a lock that expired and was taken by someone else
+        if self.token is not None and cache.get(self.key) == self.token:
+            cache.delete(self.key)
+        self.token = None
+
+
+def wait_for(get, timeout, interval=0.05):
+    """Poll get() until it returns something other than None or timeout passes."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(interval)
+        value = get()
+        if value is not None:
+            return value
+    return None
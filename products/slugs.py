@@ -0,0 +1,111 @@
+from django.db import IntegrityError, connection, transaction
+from django.utils.text import slugify
+
+MAX_ATTEMPTS = 5
+# room for a "-<n>" suffix inside the slug field
+SUFFIX_RESERVE = 8
+
+
+def slug_base(instance):
+    max_length = instance._meta.get_field("slug").max_length - SUFFIX_RESERVE
+    return slugify(instance.name)[:max_length].strip("-") or instance._meta.model_name
+
+
+class SlugPool:
+    """
+    Taken slugs grouped by base: base itself counts as suffix 0,
+    base-<n> as n. Hands out the lowest free suffix per base.
+    """
+
+    def __init__(self, bases, taken):
+        self.used = {base: set() for base in bases}
+        self.next = dict.fromkeys(bases, 0)
+        for slug in taken:
+            self.add(slug)
+
+    def add(self, slug):
+        # "oak-chair-2" is both base "oak-chair-2" and suffix 2 of "oak-chair"
+        if slug in self.used:
+            self.used[slug].add(0)
+        head, _, n = slug.rpartition("-")
+        if head in self.used and n.isdigit():
+            self.used[head].add(int(n))
+
+    def allocate(self, base):
+        used = self.used[base]
+        n = self.next[base]
+        while n in used:
+            n += 1
+        self.next[base] = n + 1
+        slug = f"{base}-{n}" if n else base
+        self.add(slug)
+        return slug
+
+
+def _taken(model, bases, exclude_pk=None):
+    """
+    Every existing slug equal to one of bases or of the form base-*, in
+    one query. "-" sorts just before "." under both binary and UCA
+    collations, so base-* is an index range scan on the unique slug index
+    where LIKE 'base%' is not on SQLite. Built as raw SQL because the ORM
+    spends longer compiling thousands of OR-ed lookups than SQLite spends
+    running them.
+    """
+    qn = connection.ops.quote_name
+    slug = qn("slug")
+    terms = [f"{slug} IN ({', '.join(['%s'] * len(bases))})"]
+    params = list(bases)
+    for base in bases:
+        terms.append(f"({slug} >= %s AND {slug} < %s)")
+        params += [f"{base}-", f"{base}."]
+    sql = f"SELECT {slug} FROM {qn(model._meta.db_table)} WHERE ({' OR '.join(terms)})"
+    if exclude_pk is not None:
+        sql += f" AND {qn(model._meta.pk.column)} <> %s"
+        params.append(exclude_pk)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def allocate_slug(instance):
+    """Free slug for instance; called by save() when the slug is blank."""
+    base = slug_base(instance)
+    return SlugPool([base], _taken(type(instance), [base], exclude_pk=instance.pk)).allocate(base)
+
+
+def assign_slugs(instances, chunk_size=400):
+    """
+    Fill in missing slugs on unsaved instances before bulk_create, which
+    never calls save(). One query per chunk of distinct bases.
+    """
+    pending = [obj for obj in instances if not obj.slug]
+    if not pending:
+        return
+    model = type(pending[0])
+    wanted = [slug_base(obj) for obj in pending]
+    bases = sorted(set(wanted))
+    # SQLite caps expression depth at 1000, so chunk the OR-ed ranges
+    taken = [obj.slug for obj in instances if obj.slug]
+    for i in range(0, len(bases), chunk_size):
+        taken += _taken(model, bases[i:i + chunk_size])
+    pool = SlugPool(bases, taken)
+    for obj, base in zip(pending, wanted):
+        obj.slug = pool.allocate(base)
+
+
+def save_with_unique_slug(instance, save, *args, **kwargs):
+    """
+    Allocate a slug and save. A concurrent insert can take the same slug
+    between the lookup and the INSERT; retry with a fresh slug when the
+    unique constraint trips on it.
+    """
+    for attempt in range(MAX_ATTEMPTS):
+        instance.slug = allocate_slug(instance)
+        try:
+            with transaction.atomic():
+                return save(*args, **kwargs)
+        except IntegrityError:
+            conflict = type(instance)._default_manager.filter(slug=instance.slug).exclude(pk=instance.pk).exists()
+            instance.slug = ""
+            if not conflict or attempt == MAX_ATTEMPTS - 1:
+                raise
@@ -0,0 +1,200 @@
+import datetime
+import threading
+import time
+from decimal import ROUND_CEILING, ROUND_FLOOR
+
+from django.conf import settings
+
+from .cache import get_version
+from .models import Product
+
+try:
+    import numpy as np
+except ImportError:  # optional; listings then always go to the database
+    np = None
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+MICROSECOND = datetime.timedelta(microseconds=1)
+# rows committed late can carry an updated_at just behind the watermark
+OVERLAP = datetime.timedelta(seconds=60)
+ORDERINGS = (None, "price", "-price", "created_at", "-created_at")
+COLUMNS = ("id", "price", "stock", "created_at", "is_active", "updated_at")
+
+
+def to_cents(price, rounding=ROUND_FLOOR):
+    return int(price.scaleb(2).to_integral_value(rounding))
+
+
+def _micros(value):
+    return (value - EPOCH) // MICROSECOND
+
+
+def _columns(rows):
+    rows = list(rows)
+    return {
+        "ids": np.fromiter((r[0] for r in rows), np.int64, len(rows)),
+        "price": np.fromiter((to_cents(r[1]) for r in rows), np.int64, len(rows)),
+        "stock": np.fromiter((r[2] for r in rows), np.int64, len(rows)),
+        "created": np.fromiter((_micros(r[3]) for r in rows), np.int64, len(rows)),
+        "active": np.fromiter((r[4] for r in rows), np.bool_, len(rows)),
+    }, max((r[5] for r in rows), default=None)
+
+
+def _links(product_ids=None):
+    links = Product.categories.through.objects.order_by("category_id", "product_id")
+    if product_ids is not None:
+        links = links.filter(product_id__in=product_ids)
+    pairs = list(links.values_list("category_id", "product_id").iterator(chunk_size=10000))
+    return (np.fromiter((c for c, _ in pairs), np.int64, len(pairs)),
+            np.fromiter((p for _, p in pairs), np.int64, len(pairs)))
+
+
+class CatalogSnapshot:
+    """
+    Every product as columnar NumPy arrays sorted by id: price (in cents),
+    stock, created_at (µs since the epoch) and is_active, plus category
+    links as (category, product) pairs sorted by category. Price ranges
+    are a searchsorted over a precomputed price order; filters are boolean
+    masks. Snapshots are immutable: refreshed() returns a new one, so
+    readers never see a half-applied update.
+    """
+
+    def __init__(self, columns, links, watermark, version, by_price=None, by_created=None):
+        self.ids, self.price, self.stock = columns["ids"], columns["price"], columns["stock"]
+        self.created, self.active = columns["created"], columns["active"]
+        self.link_category, self.link_product = links
+        self.watermark = watermark
+        self.version = version
+        self.refreshed_at = time.monotonic()
+        # row orders by (price, id) and (created_at, id); ids are already sorted
+        self.by_price = np.lexsort((self.ids, self.price)) if by_price is None else by_price
+        self.by_created = np.lexsort((self.ids, self.created)) if by_created is None else by_created
+        self.sorted_price = self.price[self.by_price]
+
+    @classmethod
+    def build(cls, version):
+        rows = Product.objects.order_by("id").values_list(*COLUMNS).iterator(chunk_size=10000)
+        columns, watermark = _columns(rows)
+        return cls(columns, _links(), watermark, version)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def refreshed(self, version):
+        """
+        Apply rows whose updated_at moved since the last refresh. Deletes
+        leave no updated_at behind, so a row count that no longer adds up
+        means a full rebuild.
+        """
+        changed = Product.objects.order_by("id").values_list(*COLUMNS)
+        if self.watermark is not None:
+            changed = changed.filter(updated_at__gte=self.watermark - OVERLAP)
+        delta, watermark = _columns(changed)
+        watermark = max(filter(None, (self.watermark, watermark)), default=None)
+        total = Product.objects.count()
+
+        pos = np.searchsorted(self.ids, delta["ids"])
+        found = pos < len(self.ids)
+        found[found] = self.ids[pos[found]] == delta["ids"][found]
+        if len(self.ids) + int((~found).sum()) != total:
+            return type(self).build(version)
+
+        columns = {}
+        for name in ("ids", "price", "stock", "created", "active"):
+            column = getattr(self, name).copy()
+            column[pos[found]] = delta[name][found]
+            columns[name] = np.concatenate([column, delta[name][~found]])
+        by_price = by_created = None
+        if found.all():
+            # stock-only changes keep both sort orders
+            if np.array_equal(columns["price"], self.price):
+                by_price = self.by_price
+            if np.array_equal(columns["created"], self.created):
+                by_created = self.by_created
+        else:
+            order = np.argsort(columns["ids"], kind="stable")
+            columns = {name: column[order] for name, column in columns.items()}
+
+        links = (self.link_category, self.link_product)
+        stale = np.isin(self.link_product, delta["ids"])
+        fresh = _links(delta["ids"].tolist()) if len(delta["ids"]) else (links[0][:0], links[1][:0])
+        if not (np.array_equal(links[0][stale], fresh[0]) and np.array_equal(links[1][stale], fresh[1])):
+            category = np.concatenate([links[0][~stale], fresh[0]])
+            product = np.concatenate([links[1][~stale], fresh[1]])
+            order = np.lexsort((product, category))
+            links = (category[order], product[order])
+        return type(self)(columns, links, watermark, version, by_price, by_created)
+
+    def query(self, min_price=None, max_price=None, in_stock=False, category=None, ordering=None):
+        """Product ids of active products matching the filters, in ordering (None: by id)."""
+        if ordering not in ORDERINGS:
+            raise ValueError(f"unsupported ordering {ordering!r}")
+        if min_price is not None or max_price is not None or ordering in ("price", "-price"):
+            lo = 0 if min_price is None else np.searchsorted(self.sorted_price, to_cents(min_price, ROUND_CEILING), "left")
+            hi = len(self.ids) if max_price is None else np.searchsorted(self.sorted_price, to_cents(max_price), "right")
+            rows = self.by_price[lo:hi]
+        else:
+            rows = np.arange(len(self.ids))
+
+        mask = self.active[rows]
+        if in_stock:
+            mask &= self.stock[rows] > 0
+        if category is not None:
+            start, end = np.searchsorted(self.link_category, [category, category + 1])
+            member = np.zeros(len(self.ids), np.bool_)
+            member[np.searchsorted(self.ids, self.link_product[start:end])] = True
+            mask &= member[rows]
+        rows = rows[mask]
+
+        field = (ordering or "").lstrip("-")
+        if field == "created_at":
+            selected = np.zeros(len(self.ids), np.bool_)
+            selected[rows] = True
+            rows = self.by_created[selected[self.by_created]]
+        elif not field:
+            rows = np.sort(rows)
+        if ordering and ordering.startswith("-"):
+            rows = rows[::-1]
+        return self.ids[rows]
+
+
+def to_bitmap(product_ids):
+    """products.facets.to_bitmap for an id array, without a Python loop."""
+    if not len(product_ids):
+        return 0
+    member = np.zeros(int(product_ids.max()) + 1, np.bool_)
+    member[product_ids] = True
+    return int.from_bytes(np.packbits(member, bitorder="little").tobytes(), "little")
+
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+def get_catalog_snapshot():
+    """
+    This process's snapshot, brought up to date when the catalog version
+    has moved (at most every PRODUCT_SNAPSHOT_MIN_REFRESH seconds). While
+    one thread refreshes, others keep answering from the previous one.
+    None when disabled or NumPy is missing.
+    """
+    global _snapshot
+    if np is None or not settings.PRODUCT_SNAPSHOT:
+        return None
+    version = get_version("catalog")
+    snapshot = _snapshot
+    if snapshot is not None and (
+        snapshot.version == version
+        or time.monotonic() - snapshot.refreshed_at < settings.PRODUCT_SNAPSHOT_MIN_REFRESH
+    ):
+        return snapshot
+    if not _lock.acquire(blocking=snapshot is None):
+        return snapshot
+    try:
+        if _snapshot is None:
+            _snapshot = CatalogSnapshot.build(version)
+        elif _snapshot.version != version:
+            _snapshot = _snapshot.refreshed(version)
+        return _snapshot
+    finally:
+        _lock.release()
@@ -1,3 +1,309 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from OAKSLAND.pagination import KeysetPagination
+from .bulk import db_price, insert_rows
+from .listing import rebuild_listings
+from .models import Category, Product, ProductImage
+from .search import get_search_backend
+
+
+class BulkUpdateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create(username="admin", is_staff=True)
+        cls.product = Product.objects.create(name="Chair", sku="12", price="10.00", stock=5)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def bulk_update(self, entries):
+        response = self.client.post("/products/products/bulk-update/", entries, format="json")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_invalid_ids_are_reported(self):
+        results = self.bulk_update([{"id": value, "stock": 1} for value in ("abc", [1], 0, -3, "²", 2**70, True)])
+        for result in results["results"]:
+            self.assertEqual(result["status"], "error")
+            self.assertIn("id", result["errors"])
+        self.assertEqual(Product.objects.get().stock, 5)
+
+    def test_numeric_string_id(self):
+        results = self.bulk_update([{"id": str(self.product.pk), "stock": 7}])
+        self.assertEqual(results["results"][0]["status"], "updated")
+        self.assertEqual(Product.objects.get().stock, 7)
+
+    def test_numeric_sku(self):
+        results = self.bulk_update([{"sku": 12, "stock_delta": 2}])
+        self.assertEqual(results["results"][0]["id"], self.product.pk)
+        self.assertEqual(Product.objects.get().stock, 7)
+
+    def test_bodies_that_are_not_a_list_or_object(self):
+        for body in ("chair", 3, None, {"items": "chair"}):
+            response = self.client.post("/products/products/bulk-update/", body, format="json")
+            self.assertEqual(response.status_code, 400, body)
+
+    def test_stock_out_of_range(self):
+        results = self.bulk_update([{"id": self.product.pk, "stock": 2**40}, {"id": self.product.pk, "stock": "²"}])
+        self.assertEqual([result["status"] for result in results["results"]], ["error", "error"])
+
+
+class ListingReadModelTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username="shopper")
+        for i in range(1, 31):
+            Product.objects.create(name=f"Chair {i}", price=f"{i}.00", stock=i % 3)
+
+    def setUp(self):
+        # signed in, so responses skip the anonymous response cache
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def count(self, query):
+        return self.client.get(f"/products/products/?{query}").json()["count"]
+
+    def test_filters_match_the_orm_path(self):
+        rebuild_listings()
+        queries = ["", "max_price=5", "min_price=20", "in_stock=true", "min_price=10&max_price=20&in_stock=1"]
+        expected = [self.count(query) for query in queries]
+        with override_settings(PRODUCT_LISTING_READ_MODEL=True):
+            self.assertEqual([self.count(query) for query in queries], expected)
+        self.assertEqual(expected[:3], [30, 5, 11])
+
+
+class ConditionalListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = [Product.objects.create(name=f"Chair {i}", price="10.00") for i in range(3)]
+
+    def test_deactivating_an_older_product_changes_the_list(self):
+        client = APIClient()
+        response = client.get("/products/products/")
+        self.assertFalse(response.has_header("Last-Modified"))
+        etag = response["ETag"]
+        product = self.products[0]
+        product.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        response = client.get("/products/products/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 2)
+
+
+class ProductListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username="shopper")
+        category = Category.objects.create(name="Chairs")
+        cls.products = [Product.objects.create(name=f"Chair {i}", price=f"{i}.00") for i in range(1, 31)]
+        category.products.set(cls.products)
+        ProductImage.objects.bulk_create(
+            [ProductImage(product=p, image=f"product_images/chair-{p.pk}.jpg") for p in cls.products for _ in range(2)]
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        for size in (5, 25):
+            with mock.patch.object(KeysetPagination, "page_size", size):
+                with self.assertNumQueries(5):
+                    response = self.client.get("/products/products/")
+            results = response.json()["results"]
+            self.assertEqual(len(results), size)
+            self.assertEqual({len(p["images"]) for p in results}, {2})
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username="shopper")
+        cls.oak = Product.objects.create(name="Oak chair", price="10.00")
+        cls.oakland = Product.objects.create(name="Oakland chair", price="10.00")
+        cls.described = Product.objects.create(name="Chair", description="Solid oak legs", price="10.00")
+        Product.objects.create(name="Pine table", price="10.00")
+
+    def setUp(self):
+        if get_search_backend() is None:
+            self.skipTest("no full-text backend for this database")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, query):
+        return self.client.get(f"/products/products/?{query}").json()
+
+    def test_ranked_matches(self):
+        data = self.search("search=oak")
+        # exact token over prefix, name over description
+        self.assertEqual([p["id"] for p in data["results"]], [self.oak.pk, self.oakland.pk, self.described.pk])
+        self.assertEqual(data["count"], 3)
+
+    def test_ordering_overrides_rank(self):
+        data = self.search("search=chair&ordering=-created_at")
+        self.assertEqual([p["id"] for p in data["results"]], [self.described.pk, self.oakland.pk, self.oak.pk])
+
+    def test_no_match(self):
+        self.assertEqual(self.search("search=walnut")["count"], 0)
+        self.assertEqual(self.search("search=%21%21")["count"], 0)
+
+    def test_count_and_pages_go_past_the_old_result_cap(self):
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        insert_rows(Product, ["name", "slug", "description", "price", "stock", "is_active", "created_at", "updated_at"],
+                    [(f"Teak stool {i}", f"teak-stool-{i}", "", db_price(5), 1, True, now, now) for i in range(1200)])
+        get_search_backend().rebuild()
+        data = self.search("search=teak")
+        self.assertEqual(data["count"], 1200)
+        self.assertEqual(len(self.search("search=teak&page=60")["results"]), 20)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username="shopper")
+        # repeated prices, so pages break inside runs of equal values
+        cls.products = [Product.objects.create(name=f"Chair {i}", price=f"{i % 7}.00") for i in range(45)]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url, link):
+        ids, pages = [], []
+        while url:
+            data = self.client.get(url).json()
+            self.assertNotIn("count", data)
+            page = [p["id"] for p in data["results"]]
+            ids.extend(page)
+            pages.append(page)
+            url = data[link]
+        return ids, pages
+
+    def check(self, query, expected):
+        ids, pages = self.walk(f"/products/products/?cursor=&{query}", "next")
+        self.assertEqual(ids, expected)
+        self.assertEqual([len(page) for page in pages], [20, 20, 5])
+        # back from the last page's previous link to the first page
+        previous = self.client.get(f"/products/products/?cursor=&{query}").json()
+        for _ in range(2):
+            previous = self.client.get(previous["next"]).json()
+        back, _ = self.walk(previous["previous"], "previous")
+        self.assertEqual(back, [pk for page in reversed(pages[:-1]) for pk in page])
+
+    def test_default_ordering_is_newest_id_first(self):
+        self.check("", sorted((p.pk for p in self.products), reverse=True))
+
+    def test_ordering_with_ties(self):
+        prices = dict(Product.objects.values_list("pk", "price"))
+        self.check("ordering=price", sorted(prices, key=lambda pk: (prices[pk], pk)))
+        self.check("ordering=-price", sorted(prices, key=lambda pk: (-prices[pk], -pk)))
+
+
+def png(name, size=(300, 200)):
+    from PIL import Image
+
+    buf = BytesIO()
+    Image.new("RGB", size, "brown").save(buf, "PNG")
+    return SimpleUploadedFile(name, buf.getvalue(), content_type="image/png")
+
+
+class MediaTestCase(TestCase):
+    """Uploads go to a temporary MEDIA_ROOT; variants render during the save."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root, PRODUCT_IMAGE_VARIANTS_SYNC=True)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.media_root = media_root
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.media_root, name))
+
+
+class ImageVariantTests(MediaTestCase):
+    def test_replacing_an_image_deletes_its_old_variants(self):
+        product = Product.objects.create(name="Chair", price="10.00")
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(product=product, image=png("chair.png"))
+        image.refresh_from_db()
+        old = [v["name"] for key, v in image.variants.items() if key != "source"]
+        self.assertEqual(len(old), 6)
+        self.assertTrue(all(map(self.exists, old)))
+
+        image.image = png("chair-side.png")
+        with self.captureOnCommitCallbacks(execute=True):
+            image.save()
+        image.refresh_from_db()
+        self.assertEqual(image.variants["source"], image.image.name)
+        self.assertFalse(any(map(self.exists, old)))
+        self.assertTrue(all(self.exists(v["name"]) for key, v in image.variants.items() if key != "source"))
+
+
+class MediaCachingTests(MediaTestCase):
+    def get(self, name):
+        response = self.client.get(f"/media/{name}")
+        b"".join(response.streaming_content)
+        return response
+
+    def test_variants_are_immutable_and_uploads_are_not(self):
+        product = Product.objects.create(name="Chair", price="10.00")
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(product=product, image=png("chair.png"))
+        image.refresh_from_db()
+
+        response = self.get(image.variants["thumbnail"]["name"])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=31536000", response["Cache-Control"])
+
+        response = self.get(image.image.name)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("immutable", response["Cache-Control"])
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create(username="admin", is_staff=True)
+
+    def export(self, query=""):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get(f"/products/products/export/?{query}")
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+    def test_incremental_export_reports_deactivations_and_deletions(self):
+        kept, deactivated, deleted = (Product.objects.create(name=name, price="10.00") for name in ("A", "B", "C"))
+        since = timezone.now()
+        kept.save()
+        deactivated.is_active = False
+        deactivated.save()
+        deleted_pk = deleted.pk
+        deleted.delete()
+
+        rows = self.export(urlencode({"updated_since": since.isoformat()}))
+        self.assertEqual([(row["id"], row["is_active"]) for row in rows[:2]], [(kept.pk, True), (deactivated.pk, False)])
+        self.assertEqual(rows[2]["id"], deleted_pk)
+        self.assertTrue(rows[2]["deleted"])
+        self.assertEqual(len(rows), 3)
+
+        # a full export is the live catalog only
+        self.assertEqual([row["id"] for row in self.export()], [kept.pk])
@@ -0,0 +1,71 @@
+from collections import deque
+
+from django.core.cache import cache
+
+from .models import Category
+
+CACHE_KEY = "products:category_tree"
+
+
+class CategoryTree:
+    """
+    All active categories held in memory, linked parent -> children.
+    Built from a single query and cached until a Category changes.
+    """
+
+    def __init__(self, categories):
+        self.nodes = {}
+        self.child_ids = {}
+        for category in categories:
+            self.nodes[category.id] = category
+            self.child_ids.setdefault(category.parent_id, []).append(category.id)
+
+    def get(self, category_id):
+        return self.nodes.get(category_id)
+
+    def roots(self):
+        return self.children(None)
+
+    def children(self, category_id):
+        return [self.nodes[pk] for pk in self.child_ids.get(category_id, ())]
+
+    def ancestors(self, category_id):
+        """Active ancestors of a category, root first."""
+        chain = []
+        node = self.nodes.get(category_id)
+        while node is not None and node.parent_id is not None:
+            node = self.nodes.get(node.parent_id)
+            if node is None or node in chain:
+                break
+            chain.append(node)
+        chain.reverse()
+        return chain
+
+    def descendant_ids(self, category_id, include_self=True):
+        """Ids of every active category below category_id (breadth first)."""
+        ids = [category_id] if include_self else []
+        seen = {category_id}
+        queue = deque([category_id])
+        while queue:
+            pk = queue.popleft()
+            for child_id in self.child_ids.get(pk, ()):
+                if child_id not in seen:
+                    seen.add(child_id)
+                    ids.append(child_id)
+                    queue.append(child_id)
+        return ids
+
+    def descendants(self, category_id):
+        return [self.nodes[pk] for pk in self.descendant_ids(category_id, include_self=False)]
+
+
+def get_category_tree():
+    tree = cache.get(CACHE_KEY)
+    if tree is None:
+        tree = CategoryTree(Category.objects.filter(is_active=True))
+        cache.set(CACHE_KEY, tree, None)
+    return tree
+
+
+def invalidate_category_tree():
+    cache.delete(CACHE_KEY)
@@ -2,7 +2,7 @@ from rest_framework.routers import DefaultRouter
 from .views import CategoryViewSet, ProductViewSet, ProductImageViewSet
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ProductViewSet
+from .views import AutocompleteView, ProductViewSet
 
 router = DefaultRouter()
 router.register(r"categories", CategoryViewSet, basename="category")
@@ -11,6 +11,7 @@ router.register(r"product-images", ProductImageViewSet, basename="productimage")
 
 
 urlpatterns = [
+    path("autocomplete/", AutocompleteView.as_view(), name="product-autocomplete"),
     path("", include(router.urls)),
 ]
 
@@ -1,11 +1,37 @@
+from decimal import Decimal, InvalidOperation
+from itertools import chain
+
 from rest_framework import viewsets, filters
 from rest_framework.permissions import IsAdminUser, AllowAny
-from .models import Category, Product, ProductImage
-from .serializers import CategorySerializer, ProductSerializer, ProductImageSerializer
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from OAKSLAND.pagination import KeysetPagination
+from OAKSLAND.renderers import JSONRenderer, NDJSONRenderer
+from .models import Category, Product, ProductImage, ProductListing, ProductTombstone
+from .serializers import CategorySerializer, ProductExportSerializer, ProductSerializer, ProductImageSerializer
+from .autocomplete import get_autocomplete
+from .bulk import apply_price_stock_updates
+from .cache import cached_response
+from .compiled import CompiledSerializer
+from .conditional import category_validators, conditional_get, product_detail_validators, product_list_validators
+from .facets import attribute_filters, cached_facet_counts, filter_by_attributes, get_facet_index
+from .listing import listing_data, mark_stale
+from .search import ProductSearchFilter
+from .signals import catalog_changed
+from .snapshot import ORDERINGS, get_catalog_snapshot, to_bitmap as snapshot_bitmap
+from .tree import get_category_tree
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework import status
 
+FALSE_VALUES = {"0", "false", "no", "off"}
+EXPORT_CHUNK_SIZE = 500
+
+
 class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.filter(is_active=True, parent__isnull=True)
     serializer_class = CategorySerializer
@@ -17,35 +43,291 @@ class CategoryViewSet(viewsets.ModelViewSet):
             return [IsAdminUser()]
         return [AllowAny()]
 
+    @cached_response
+    @conditional_get(category_validators)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_response
+    @conditional_get(category_validators)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    def get_queryset(self):
+        if self.action == "products":
+            # any active category has a product page, not just the roots
+            return Category.objects.filter(is_active=True)
+        return super().get_queryset()
+
     @action(detail=True, methods=["get"])
     def products(self, request, slug=None):
+        """
+        Products in the category and, unless ?descendants=false, every
+        category below it. The subtree comes from the cached category
+        tree, so this is one query however deep the tree goes.
+        """
         category = self.get_object()
-        products = Product.objects.filter(categories=category, is_active=True)
+        include_descendants = request.query_params.get("descendants", "true").lower() not in FALSE_VALUES
+        if include_descendants:
+            category_ids = get_category_tree().descendant_ids(category.pk)
+        else:
+            category_ids = [category.pk]
+        links = Product.categories.through.objects.filter(category_id__in=category_ids)
+        products = Product.objects.for_catalog().filter(pk__in=links.values("product_id"))
         page = self.paginate_queryset(products)
-        serializer = ProductSerializer(page or products, many=True, context={"request": request})
-        return self.get_paginated_response(serializer.data) if page is not None else Response(serializer.data)
+        compiled = CompiledSerializer(ProductSerializer, {"request": request})
+        if page is not None:
+            return self.get_paginated_response(compiled.many(page))
+        return Response(compiled.many(products))
 
 
 class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.filter(is_active=True)
+    queryset = Product.objects.for_catalog()
     serializer_class = ProductSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [ProductSearchFilter, filters.OrderingFilter]
     search_fields = ["name", "description", "sku"]
     ordering_fields = ["price", "created_at"]
     permission_classes = [AllowAny]
 
     def get_permissions(self):
-        if self.action in ("create", "update", "partial_update", "destroy"):
+        if self.action in ("create", "update", "partial_update", "destroy", "bulk_update", "export"):
             return [IsAdminUser()]
         return [AllowAny()]
 
     def get_queryset(self):
-        qs = Product.objects.filter(is_active=True)
+        qs = Product.objects.for_catalog()
         category = self.request.query_params.get("category")
         if category:
             qs = qs.filter(categories__id=category)
+        min_price, max_price, in_stock = self.stock_price_filters()
+        if min_price is not None:
+            qs = qs.filter(price__gte=min_price)
+        if max_price is not None:
+            qs = qs.filter(price__lte=max_price)
+        if in_stock:
+            qs = qs.filter(stock__gt=0)
+        attrs = attribute_filters(self.request.query_params)
+        if attrs:
+            qs = filter_by_attributes(qs, attrs)
         return qs.distinct()
 
+    def stock_price_filters(self):
+        """(min_price, max_price, in_stock) from the query string."""
+        params = self.request.query_params
+        prices = []
+        for name in ("min_price", "max_price"):
+            value = params.get(name)
+            try:
+                prices.append(Decimal(value) if value else None)
+            except InvalidOperation:
+                raise ValidationError({name: "Enter a number."})
+            if prices[-1] is not None and not prices[-1].is_finite():
+                raise ValidationError({name: "Enter a number."})
+        in_stock = params.get("in_stock", "").lower() not in FALSE_VALUES | {""}
+        return prices[0], prices[1], in_stock
+
+    def snapshot_ids(self):
+        """
+        Ids for this listing from the in-memory catalog snapshot, or None
+        when the snapshot is off or the request uses anything it cannot
+        answer (search, attribute filters, cursors, other orderings).
+        """
+        if not hasattr(self, "_snapshot_ids"):
+            self._snapshot_ids = None
+            params = self.request.query_params
+            ordering = params.get("ordering") or None
+            category = params.get("category")
+            if (ordering in ORDERINGS and (not category or category.isdigit())
+                    and KeysetPagination.cursor_query_param not in params
+                    and not ProductSearchFilter().get_search_terms(self.request)
+                    and not attribute_filters(params)):
+                snapshot = get_catalog_snapshot()
+                if snapshot is not None:
+                    min_price, max_price, in_stock = self.stock_price_filters()
+                    self._snapshot = snapshot
+                    self._snapshot_ids = snapshot.query(
+                        min_price, max_price, in_stock, int(category) if category else None, ordering
+                    )
+        return self._snapshot_ids
+
+    @cached_response
+    @conditional_get(product_list_validators)
+    def list(self, request, *args, **kwargs):
+        ids = self.snapshot_ids()
+        if ids is not None:
+            return self.list_from_snapshot(ids)
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.use_listing():
+            listings = self.get_listing_queryset(queryset)
+            page = self.paginate_queryset(listings)
+            data = listing_data(listings if page is None else page, request)
+        else:
+            page = self.paginate_queryset(queryset)
+            data = CompiledSerializer(ProductSerializer, self.get_serializer_context()).many(
+                queryset if page is None else page
+            )
+        if page is None:
+            return Response(data)
+        response = self.get_paginated_response(data)
+        if self.wants_facets():
+            response.data["facets"] = self.facet_counts(queryset)
+        return response
+
+    def list_from_snapshot(self, ids):
+        """Page over the snapshot's ordered ids; only the page's rows come from the database."""
+        page = self.paginate_queryset(ids)
+        page_ids = [int(pk) for pk in (ids if page is None else page)]
+        if self.use_listing():
+            rows = ProductListing.objects.in_bulk(page_ids)
+            data = listing_data([rows[pk] for pk in page_ids if pk in rows], self.request)
+        else:
+            rows = Product.objects.for_catalog().in_bulk(page_ids)
+            data = CompiledSerializer(ProductSerializer, self.get_serializer_context()).many(
+                rows[pk] for pk in page_ids if pk in rows
+            )
+        if page is None:
+            return Response(data)
+        response = self.get_paginated_response(data)
+        if self.wants_facets():
+            response.data["facets"] = get_facet_index().counts(snapshot_bitmap(ids))
+        return response
+
+    def wants_facets(self):
+        """Facets come with ?facets=true or attribute filters; ?facets=false turns them off."""
+        params = self.request.query_params
+        if "facets" in params:
+            return params["facets"].lower() not in FALSE_VALUES
+        return bool(attribute_filters(params))
+
+    def facet_counts(self, queryset):
+        """
+        Facet counts for the filtered queryset. When attribute filters are
+        the only filters, the result set comes straight from the facet
+        index's bitmaps; anything else is counted over queryset's ids
+        once per filter set and catalog version.
+        """
+        params = self.request.query_params
+        attrs = attribute_filters(params)
+        min_price, max_price, in_stock = self.stock_price_filters()
+        search = ProductSearchFilter().get_search_terms(self.request)
+        category = params.get("category") or None
+        if not (category or search or in_stock or min_price is not None or max_price is not None):
+            index = get_facet_index()
+            return index.counts(index.matching(attrs))
+        filters = {
+            "attrs": sorted((key, sorted(values)) for key, values in attrs.items()),
+            "category": category,
+            "in_stock": in_stock,
+            "max_price": max_price,
+            "min_price": min_price,
+            "search": search,
+        }
+        return cached_facet_counts(queryset, filters)
+
+    def use_listing(self):
+        # search results are ordered by relevance over Product; keep those on the serializer
+        return settings.PRODUCT_LISTING_READ_MODEL and not ProductSearchFilter().get_search_terms(self.request)
+
+    def get_listing_queryset(self, queryset):
+        """
+        ProductListing rows for the filtered products: a plain scan of the
+        read model unless category, price, stock or attribute filters need
+        a pk subquery. Price and stock are read from Product there, since
+        listings of products waiting in StaleProductListing lag behind.
+        """
+        listings = ProductListing.objects.all()
+        params = self.request.query_params
+        min_price, max_price, in_stock = self.stock_price_filters()
+        if (params.get("category") or attribute_filters(params) or in_stock
+                or min_price is not None or max_price is not None):
+            listings = listings.filter(product__in=queryset.prefetch_related(None).order_by().values("pk"))
+        return filters.OrderingFilter().filter_queryset(self.request, listings, self)
+
+    @cached_response
+    @conditional_get(product_detail_validators)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=False, methods=["post"], url_path="bulk-update")
+    def bulk_update(self, request):
+        """
+        Reprice/restock many products at once:
+        [{"id" or "sku", "price"?, "stock"?, "stock_delta"?}, ...]
+        """
+        entries = request.data
+        if isinstance(entries, dict):
+            entries = entries.get("items")
+        if not isinstance(entries, list):
+            return Response({"error": "Expected a list of updates"}, status=status.HTTP_400_BAD_REQUEST)
+        results, updated_ids = apply_price_stock_updates(entries)
+        if updated_ids:
+            mark_stale(updated_ids)
+            catalog_changed()
+        return Response({
+            "updated": len(updated_ids),
+            "errors": sum(1 for r in results if r["status"] == "error"),
+            "results": results,
+        })
+
+
+    @action(detail=False, methods=["get"], renderer_classes=[NDJSONRenderer, JSONRenderer])
+    def export(self, request):
+        """
+        Every active product with categories, images and attributes, one
+        JSON object per line. ?updated_since=<ISO datetime or date> limits
+        it to products changed since then, for incremental pulls; those
+        also carry products deactivated since (with "is_active": false)
+        and end with {"id", "deleted": true, "deleted_at"} for each
+        product deleted since.
+        """
+        products = Product.objects.for_catalog().prefetch_related("attributes").order_by("pk")
+        tombstones = []
+        updated_since = request.query_params.get("updated_since")
+        if updated_since:
+            try:
+                since = parse_datetime(updated_since)
+            except ValueError:
+                since = None
+            if since is None:
+                return Response({"error": "updated_since must be an ISO 8601 date or datetime"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            products = (
+                Product.objects.with_related().prefetch_related("attributes")
+                .filter(updated_at__gte=since).order_by("pk")
+            )
+            tombstones = keyset_chunks(ProductTombstone.objects.filter(deleted_at__gte=since), EXPORT_CHUNK_SIZE)
+        compiled = CompiledSerializer(ProductExportSerializer, {"request": request})
+        renderer = NDJSONRenderer()
+        chunks = (
+            b"".join(renderer.render(item) for item in map(compiled.to_representation, chunk))
+            for chunk in keyset_chunks(products, EXPORT_CHUNK_SIZE)
+        )
+        deletions = (
+            b"".join(
+                renderer.render({"id": row.product_id, "deleted": True, "deleted_at": row.deleted_at})
+                for row in chunk
+            )
+            for chunk in tombstones
+        )
+        return StreamingHttpResponse(chain(chunks, deletions), content_type=renderer.media_type)
+
+
+def keyset_chunks(queryset, size):
+    """
+    Lists of up to size rows in pk order, each fetched with WHERE pk > last
+    (plus its prefetches). Memory stays flat on every backend, where
+    iterator() still buffers the whole result under MySQL's default cursor.
+    """
+    last = None
+    while True:
+        chunk = list((queryset if last is None else queryset.filter(pk__gt=last))[:size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1].pk
+
 
 class ProductImageViewSet(viewsets.ModelViewSet):
     queryset = ProductImage.objects.all()
@@ -53,6 +335,27 @@ class ProductImageViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAdminUser]
 
 
+class AutocompleteView(APIView):
+    """?q=oak ch -> the most popular products and categories with a word starting "oak ch"."""
+
+    permission_classes = [AllowAny]
+    default_limit = 10
+    max_limit = 25
+    max_query_length = 100
+
+    def get(self, request):
+        query = request.query_params.get("q", "")[: self.max_query_length]
+        try:
+            limit = min(int(request.query_params.get("limit", self.default_limit)), self.max_limit)
+        except ValueError:
+            raise ValidationError({"limit": "Enter a whole number."})
+        results = get_autocomplete().suggest(query, max(limit, 1))
+        return Response({
+            "q": query,
+            "results": [{"type": kind, "id": pk, "name": name, "slug": slug} for kind, pk, name, slug in results],
+        })
+
+
 
 
 